@@ -0,0 +1,242 @@
+"""Асинхронный запуск бота на AsyncTeleBot и aiohttp.
+
+Использует те же кэши и функции, что и telbot.py, но запросы к сайту
+и к Telegram не блокируют друг друга: пока обновление ждёт ответа сайта,
+остальные пользователи получают ответы из кэша.
+
+Запуск:
+    pip install aiohttp
+    python async_bot.py
+"""
+import time
+import asyncio
+from datetime import datetime
+
+import aiohttp
+from telebot.async_telebot import AsyncTeleBot
+
+import telbot
+import metrics
+
+# Настройки HTTP-клиента (повторы повторяют SESSION из telbot.py)
+RETRY_TOTAL = 3
+RETRY_BACKOFF = 0.5
+RETRY_STATUSES = (500, 502, 503, 504)
+POOL_SIZE = 10  # Соединений с сайтом расписания одновременно
+HTTP_TIMEOUT = 15
+
+bot = AsyncTeleBot(telbot.TOKEN)
+http = {'session': None}
+refresh_lock = asyncio.Lock()
+refresh_task = {'task': None}  # Фоновое обновление (ссылка, чтобы задачу не собрал GC)
+pending_replacements = set()  # chat_id админов, от которых ждём ввод замены
+
+# -------------------------------
+# Загрузка страницы замен
+# -------------------------------
+
+async def fetch_page(previous=None):
+    """Скачивает страницу замен с повторами при ошибках сервера.
+
+    Возвращает (статус, заголовки, тело).
+    """
+    headers = telbot.PageSnapshot.request_headers(previous)
+    error = None
+    for attempt in range(RETRY_TOTAL + 1):
+        if attempt:
+            await asyncio.sleep(RETRY_BACKOFF * 2 ** (attempt - 1))
+        try:
+            with metrics.timed('site_fetch'):
+                async with http['session'].get(telbot.URL, headers=headers) as response:
+                    content = await response.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            error = e
+            continue
+        metrics.inc(f'site_status_{response.status}')
+        if response.status in RETRY_STATUSES:
+            error = RuntimeError(f"HTTP {response.status}")
+            continue
+        if response.status >= 400:
+            raise RuntimeError(f"HTTP {response.status}")
+        return response.status, response.headers, content
+    raise error
+
+async def get_cached_snapshot(force=False):
+    """Возвращает снимок из общего кэша.
+
+    Устаревший снимок отдаётся сразу, а обновление запускается отдельной
+    задачей; ждать приходится, только если снимка ещё нет или force=True.
+    Одновременные запросы ждут одну и ту же загрузку. Разбор HTML и
+    рассылка изменений выполняются в пуле потоков, чтобы не блокировать
+    цикл событий.
+    """
+    snapshot = telbot.cache['snapshot']
+    if not force and telbot.is_snapshot_fresh(snapshot):
+        return snapshot
+    if not force and snapshot is None and time.monotonic() < telbot.refresh_state['next_try']:
+        return None  # Загрузка недавно не удалась: повторит фоновая задача
+    if not force and snapshot is not None:
+        task = refresh_task['task']
+        if (task is None or task.done()) and time.monotonic() >= telbot.refresh_state['next_try']:
+            refresh_task['task'] = asyncio.create_task(get_cached_snapshot(force=True))
+        return snapshot
+
+    async with refresh_lock:
+        previous = telbot.cache['snapshot']
+        if not force and (telbot.is_snapshot_fresh(previous) or
+                          previous is None and time.monotonic() < telbot.refresh_state['next_try']):
+            return previous  # Пока ждали, страницу загрузили или загрузка не удалась
+        try:
+            status, headers, content = await fetch_page(previous)
+            loop = asyncio.get_running_loop()
+            snapshot = await loop.run_in_executor(
+                None, telbot.PageSnapshot.from_response, status, headers, content, previous
+            )
+        except Exception as e:
+            print(f"Ошибка загрузки страницы замен: {e}")
+            telbot.refresh_state['next_try'] = time.monotonic() + telbot.REFRESH_RETRY_DELAY
+            return previous
+        telbot.store_snapshot(snapshot)
+        await asyncio.to_thread(telbot.after_refresh, previous, snapshot)  # Пишет refresh_stats.json, ставит рассылку в очередь
+        return snapshot
+
+# -------------------------------
+# Отправка сообщений
+# -------------------------------
+
+async def send_message(chat_id, text, **kwargs):
+    """bot.send_message с замером времени (как telegram_send у очереди отправки)."""
+    with metrics.timed('telegram_send'):
+        return await bot.send_message(chat_id, text, **kwargs)
+
+# -------------------------------
+# Обработчики команд бота
+# -------------------------------
+
+@bot.message_handler(commands=['start'])
+async def send_welcome(message):
+    """Обработчик команды /start."""
+    await send_message(
+        message.chat.id,
+        telbot.WELCOME_TEXT,
+        parse_mode="Markdown",
+        reply_markup=telbot.welcome_markup()
+    )
+
+@bot.message_handler(commands=['group'])
+async def handle_group(message):
+    """Обработчик команды выбора группы."""
+    reply = await asyncio.to_thread(telbot.group_command_reply, message.chat.id, message.text)
+    await send_message(message.chat.id, reply, parse_mode="Markdown")
+
+@bot.message_handler(commands=['add_replacement'])
+async def handle_add_replacement(message):
+    """Обработчик команды добавления замены."""
+    if message.from_user.id not in telbot.ADMINS:
+        return
+
+    pending_replacements.add(message.chat.id)
+    await send_message(message.chat.id, telbot.REPLACEMENT_PROMPT, parse_mode="Markdown")
+
+@bot.message_handler(commands=['refresh'])
+async def handle_refresh(message):
+    """Обработчик команды принудительного обновления данных."""
+    if message.from_user.id not in telbot.ADMINS:
+        return
+
+    snapshot = await get_cached_snapshot(force=True)
+    await send_message(message.chat.id, telbot.refresh_reply(snapshot))
+
+@bot.message_handler(commands=['stats'])
+async def handle_stats(message):
+    """Обработчик команды просмотра метрик."""
+    if message.from_user.id not in telbot.ADMINS:
+        return
+
+    await send_message(message.chat.id, telbot.stats_reply())
+
+@bot.message_handler(func=lambda m: m.chat.id in pending_replacements)
+async def process_replacement(message):
+    """Обрабатывает ввод замены после /add_replacement."""
+    pending_replacements.discard(message.chat.id)
+    group = await asyncio.to_thread(telbot.users.get_group, message.chat.id, telbot.GROUP_NAME)
+    reply = await asyncio.to_thread(telbot.replacement_input_reply, message.text, group)
+    await send_message(message.chat.id, reply)
+
+@bot.message_handler(func=lambda m: True)
+async def handle_message(message):
+    """Обработчик текстовых сообщений."""
+    allowed, notice = telbot.rate_limit_notice(message.from_user.id)
+    if not allowed:
+        if notice:
+            await send_message(message.chat.id, notice)
+        return
+
+    group = await asyncio.to_thread(telbot.users.get_group, message.chat.id, telbot.GROUP_NAME)
+    try:
+        day_offset = telbot.DAY_BUTTONS.get(message.text.lower())
+        if day_offset is None:
+            await send_message(message.chat.id, telbot.UNKNOWN_INPUT_TEXT)
+            return
+        await get_cached_snapshot()
+        # Расписания и пользовательские замены читаются с диска: не в цикле событий
+        schedule_text = await asyncio.to_thread(telbot.get_schedule, day_offset, group=group, fetch=False)
+        await send_message(
+            message.chat.id,
+            schedule_text + telbot.format_update_status(),
+            parse_mode="Markdown"
+        )
+    except Exception:
+        await send_message(message.chat.id, telbot.SITE_UNAVAILABLE_TEXT)
+
+# -------------------------------
+# Фоновые задачи
+# -------------------------------
+
+async def background_updater():
+    """Фоновая задача для обновления данных (изменения рассылает get_cached_snapshot)."""
+    while True:
+        print("Обновление данных...")
+        await get_cached_snapshot(force=True)
+        await asyncio.sleep(telbot.refresh_scheduler.next_delay(datetime.now()))
+
+async def users_flusher():
+    """Фоновая задача записи настроек пользователей на диск."""
+    while True:
+        await asyncio.sleep(telbot.USERS_FLUSH_INTERVAL)
+        try:
+            await asyncio.to_thread(telbot.users.flush)
+        except Exception as e:
+            print(f"Ошибка сохранения пользователей: {e}")
+
+# -------------------------------
+# Запуск бота
+# -------------------------------
+
+async def main():
+    telbot.load_schedule()
+    telbot.send_queue.start()  # Рассылки уходят через общую очередь с лимитами Telegram
+    if telbot.METRICS_LISTEN:
+        metrics.start_server(telbot.METRICS_LISTEN)
+    connector = aiohttp.TCPConnector(limit=POOL_SIZE)
+    timeout = aiohttp.ClientTimeout(total=HTTP_TIMEOUT)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        http['session'] = session
+        tasks = [
+            asyncio.create_task(background_updater()),
+            asyncio.create_task(users_flusher())
+        ]
+        try:
+            try:
+                await bot.remove_webhook()  # Иначе после запуска telbot.py с webhook getUpdates отвечает 409
+            except Exception as e:
+                print(f"Не удалось снять webhook: {e}")
+            await bot.infinity_polling(timeout=60)
+        finally:
+            for task in tasks:
+                task.cancel()
+            telbot.users.flush()
+
+if __name__ == '__main__':
+    print("Асинхронный бот запущен...")
+    asyncio.run(main())
@@ -0,0 +1,62 @@
+"""Сравнение скорости разбора страницы замен.
+
+Базовый вариант — прежний разбор BeautifulSoup(html, 'html.parser') с
+find_all по всему дереву; с ним сравниваются способы из page_parser.
+Перед замером проверяется, что все способы дают одинаковый результат.
+
+Запуск:
+    python bench_parsers.py [fixtures/rasp_second.html] [повторов]
+"""
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+from page_parser import Page, PARSERS
+
+def extract_bs4(html):
+    """Прежний разбор: полное дерево BeautifulSoup."""
+    soup = BeautifulSoup(html, 'html.parser')
+    table = soup.find('table')
+    rows = None
+    if table:
+        rows = [[td.text for td in tr.find_all('td')] for tr in table.find_all('tr')]
+    headers = [div.get_text() for div in soup.find_all('div', align='center')]
+    return Page(rows, headers)
+
+def measure(parse, html, repeat):
+    """Среднее время одного разбора в миллисекундах (лучшее из трёх серий)."""
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            parse(html)
+        elapsed = (time.perf_counter() - start) / repeat * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main(argv):
+    path = argv[1] if len(argv) > 1 else 'fixtures/rasp_second.html'
+    repeat = int(argv[2]) if len(argv) > 2 else 20
+    with open(path, encoding='utf-8') as f:
+        html = f.read()
+
+    parsers = {'bs4 html.parser': extract_bs4}
+    parsers.update(PARSERS)
+
+    expected = extract_bs4(html)
+    for name, parse in parsers.items():
+        if parse(html) != expected:
+            print(f"{name}: результат отличается от BeautifulSoup")
+            return 1
+
+    print(f"{path}: {len(html)} символов, строк таблицы: {len(expected.rows or [])}")
+    baseline = None
+    for name, parse in parsers.items():
+        ms = measure(parse, html, repeat)
+        baseline = baseline or ms
+        print(f"{name:16} {ms:8.2f} мс  x{baseline / ms:.1f}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,124 @@
+"""Офлайн-замеры горячего пути бота на сохранённых страницах замен.
+
+Каждая страница из fixtures/ прогоняется через этапы, из которых состоит
+ответ на кнопку "Сегодня", без обращения к сайту и к Telegram:
+    snapshot            PageSnapshot.from_response (разбор HTML и индекс замен)
+    fetch_replacements  замены группы из снимка
+    parse_website_date  дата и день недели
+    get_week_type       тип недели
+    format_schedule     текст расписания с заменами
+    get_schedule        весь ответ при пустом кэше готовых текстов
+    get_schedule_cached весь ответ из кэша готовых текстов
+
+Для каждого этапа печатаются перцентили времени и выделенная память
+(tracemalloc: пик и число блоков за один вызов).
+
+Расписания берутся из тех же файлов, что и у бота (timetables.bin,
+timetables.json или test23.json); --timetables подставляет другой файл,
+например сгенерированный generate_data.py.
+
+Запуск:
+    python benchmark.py [повторов] [страницы...] [--timetables ФАЙЛ] [--group ГРУППА]
+    python benchmark.py 200 fixtures/rasp_worst.html
+"""
+import os
+import glob
+import argparse
+import time
+import tracemalloc
+
+# Бот создаётся при импорте telbot, и TeleBot проверяет формат токена;
+# к Telegram замеры не обращаются
+os.environ.setdefault('TELBOT_TOKEN', '123456:BENCHMARK')
+
+import telbot
+from metrics import percentile
+
+FIXTURES = 'fixtures/rasp_*.html'
+STAGES = (
+    'snapshot', 'fetch_replacements', 'parse_website_date', 'get_week_type',
+    'format_schedule', 'get_schedule', 'get_schedule_cached'
+)
+
+def stage_calls(content, group):
+    """Функции этапов для одной страницы. Снимок становится текущим в кэше."""
+    snapshot = telbot.PageSnapshot.from_response(200, {}, content)
+    telbot.store_snapshot(snapshot)
+    schedule = telbot.load_schedule(group)
+    day_schedule = next((weeks[telbot.get_week_type(snapshot)] for weeks in schedule.values()
+                         if telbot.get_week_type(snapshot) in weeks), {})
+    replacements = telbot.get_merged_replacements(snapshot, group)
+
+    def get_schedule():
+        telbot.rendered_cache['version'] = None  # Каждый вызов рендерит текст заново
+        return telbot.get_schedule(0, group=group, fetch=False)
+
+    return {
+        'snapshot': lambda: telbot.PageSnapshot.from_response(200, {}, content),
+        'fetch_replacements': lambda: telbot.fetch_replacements(snapshot, group),
+        'parse_website_date': lambda: telbot.parse_website_date(snapshot),
+        'get_week_type': lambda: telbot.get_week_type(snapshot),
+        'format_schedule': lambda: telbot.format_schedule(day_schedule, replacements),
+        'get_schedule': get_schedule,
+        'get_schedule_cached': lambda: telbot.get_schedule(0, group=group, fetch=False)
+    }
+
+def measure(func, repeat):
+    """Время вызовов (мкс, по возрастанию), пик памяти (КБ) и число блоков за вызов."""
+    func()  # Прогрев
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        func()
+        timings.append((time.perf_counter_ns() - start) / 1000)
+    timings.sort()
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    result = func()
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename') if stat.count_diff > 0)
+    del result
+    return timings, peak / 1024, blocks
+
+def run(paths, repeat, group=telbot.GROUP_NAME):
+    print(f"{'страница / этап':34} {'p50 мкс':>10} {'p90 мкс':>10} {'p99 мкс':>10} {'макс мкс':>10} {'пик КБ':>9} {'новых блоков':>13}")
+    for path in paths:
+        with open(path, 'rb') as f:
+            content = f.read()
+        calls = stage_calls(content, group)
+        rows = len(telbot.cache['snapshot'].replacements or {})
+        print(f"{path} ({len(content) // 1024} КБ, групп с заменами: {rows})")
+        for stage in STAGES:
+            timings, peak, blocks = measure(calls[stage], repeat)
+            print(
+                f"  {stage:32} {percentile(timings, 0.5):10.1f} {percentile(timings, 0.9):10.1f} "
+                f"{percentile(timings, 0.99):10.1f} {timings[-1]:10.1f} {peak:9.1f} {blocks:13}"
+            )
+
+def use_timetables(path):
+    """Подставляет файл расписаний вместо рабочих timetables.bin / timetables.json."""
+    if path.endswith('.bin'):
+        telbot.TIMETABLES_BIN, telbot.TIMETABLES_FILE = path, ''
+    else:
+        telbot.TIMETABLES_BIN, telbot.TIMETABLES_FILE = '', path
+
+def main():
+    parser = argparse.ArgumentParser(description="Офлайн-замеры горячего пути бота")
+    parser.add_argument('repeat', type=int, nargs='?', default=100, help="повторов каждого этапа")
+    parser.add_argument('pages', nargs='*', help=f"страницы замен (по умолчанию {FIXTURES})")
+    parser.add_argument('--timetables', help="файл расписаний (.bin или .json) вместо файлов бота")
+    parser.add_argument('--group', default=telbot.GROUP_NAME, help="группа, для которой строится ответ")
+    args = parser.parse_args()
+
+    if args.timetables:
+        if not os.path.exists(args.timetables):
+            parser.error(f"нет файла {args.timetables}")
+        use_timetables(args.timetables)
+    run(args.pages or sorted(glob.glob(FIXTURES)), args.repeat, args.group)
+
+if __name__ == '__main__':
+    main()
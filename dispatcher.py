@@ -0,0 +1,92 @@
+"""Параллельная обработка обновлений Telegram с сохранением порядка в чате.
+
+Обновления разных чатов обрабатываются пулом потоков одновременно, поэтому
+медленный ответ одному пользователю не задерживает остальных. Обновления
+одного чата выполняются строго по очереди: это нужно, например, для
+register_next_step_handler в /add_replacement, где ответ администратора
+должен обрабатываться после команды.
+"""
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+def update_chat_id(update):
+    """chat_id обновления или None, если чата у него нет."""
+    for message in (update.message, update.edited_message, update.channel_post, update.edited_channel_post):
+        if message is not None:
+            return message.chat.id
+    callback = update.callback_query
+    if callback is not None and callback.message is not None:
+        return callback.message.chat.id
+    return None
+
+class ChatDispatcher:
+    """Пул обработчиков обновлений с очередью на каждый чат.
+
+    process — функция, принимающая список обновлений (обычно
+    bot.process_new_updates бота с threaded=False). max_pending ограничивает
+    число обрабатываемых и ждущих обновлений. ack(update_id) вызывается
+    в process_new_updates до постановки обновлений в пул: при long polling
+    через него бот запоминает last_update_id, иначе следующий getUpdates
+    вернёт ещё не обработанные обновления повторно.
+    """
+
+    def __init__(self, process, workers=8, max_pending=100, ack=None):
+        self.process = process
+        self.ack = ack
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.lock = threading.Lock()
+        self.chats = {}  # chat_id -> очередь ждущих обновлений; есть запись — чат обрабатывается
+        self.stats = {'processed': 0, 'rejected': 0, 'failed': 0}
+
+    def submit(self, update, block=False):
+        """Ставит обновление в обработку. False, если очередь заполнена и block=False."""
+        if not self.slots.acquire(blocking=block):
+            with self.lock:
+                self.stats['rejected'] += 1
+            return False
+        chat_id = update_chat_id(update)
+        if chat_id is not None:
+            with self.lock:
+                queue = self.chats.get(chat_id)
+                if queue is not None:
+                    queue.append(update)
+                    return True
+                self.chats[chat_id] = deque()
+        self.executor.submit(self._run, chat_id, update)
+        return True
+
+    def process_new_updates(self, updates):
+        """Замена bot.process_new_updates для long polling: ждёт, если очередь заполнена."""
+        if self.ack and updates:
+            self.ack(max(update.update_id for update in updates))
+        for update in updates:
+            self.submit(update, block=True)
+
+    def _run(self, chat_id, update):
+        outcome = 'processed'
+        try:
+            self.process([update])
+        except Exception as e:
+            outcome = 'failed'
+            print(f"Ошибка обработки обновления {update.update_id}: {e}")
+        finally:
+            self.slots.release()
+        with self.lock:
+            self.stats[outcome] += 1
+            if chat_id is None:
+                return
+            queue = self.chats[chat_id]
+            if not queue:
+                del self.chats[chat_id]
+                return
+            update = queue.popleft()
+        # Следующее обновление чата — отдельной задачей, чтобы чат с длинной
+        # очередью не занимал поток дольше остальных
+        self.executor.submit(self._run, chat_id, update)
+
+    def pending(self):
+        """Число чатов, обновления которых сейчас обрабатываются или ждут."""
+        with self.lock:
+            return len(self.chats)
@@ -0,0 +1,191 @@
+"""Локальный заменитель сайта расписания для тестов и замеров без сети.
+
+Отдаёт сохранённые или сгенерированные страницы замен по тому же пути,
+что и настоящий сайт (/timetable/rasp_second.html), и умеет вести себя
+как плохой сервер:
+    latency       задержка каждого ответа (плюс случайная добавка jitter);
+    error_rate    доля ответов с ошибкой 500/502/503/504 — теми же кодами,
+                  на которые SESSION в telbot.py делает повторы;
+    timeout_rate  доля запросов, на которые сервер молчит hang секунд
+                  и закрывает соединение без ответа;
+    change_every  страницы из списка сменяют друг друга каждые столько
+                  секунд, как при публикации новых замен посреди дня.
+Поддерживаются ETag / Last-Modified и ответ 304 на If-None-Match и
+If-Modified-Since, как у настоящего сервера.
+
+Запуск:
+    python fake_site.py --port 8000 --change-every 600 --error-rate 0.1 \\
+        fixtures/rasp_small.html fixtures/rasp_second.html
+и в telbot.py:
+    URL = "http://127.0.0.1:8000/timetable/rasp_second.html"
+"""
+import time
+import random
+import hashlib
+import argparse
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PATH = '/timetable/rasp_second.html'
+ERROR_STATUSES = (500, 502, 503, 504)
+
+class FakeSiteHandler(BaseHTTPRequestHandler):
+    """Ответ на GET страницы замен с учётом настроек сервера."""
+
+    def do_GET(self):
+        server = self.server
+        if self.path.split('?', 1)[0] != PATH:
+            return self._reply(404)
+        outcome, delay = server.roll()
+        if delay:
+            time.sleep(delay)
+        if outcome == 'timeout':
+            time.sleep(server.hang)
+            self.close_connection = True
+            return
+        if outcome != 200:
+            return self._reply(outcome)
+
+        content, etag, modified = server.current_page()
+        if self.not_modified(etag, modified):
+            server.count('not_modified')
+            return self._reply(304, headers={'ETag': etag})
+        server.count('ok')
+        self._reply(200, content, {
+            'Content-Type': 'text/html; charset=utf-8',
+            'ETag': etag,
+            'Last-Modified': formatdate(modified, usegmt=True)
+        })
+
+    def not_modified(self, etag, modified):
+        """Условный запрос: If-None-Match важнее If-Modified-Since (RFC 9110)."""
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            return if_none_match == etag
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since is None:
+            return False
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(modified) <= since  # Last-Modified передаётся с точностью до секунды
+
+    def _reply(self, status, content=b'', headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        if content:
+            self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+class FakeSite(ThreadingHTTPServer):
+    """Сервер страниц замен с настраиваемыми задержками, ошибками и сменой страниц."""
+    daemon_threads = True
+
+    def __init__(self, pages, listen=('127.0.0.1', 0), latency=0.0, jitter=0.0, error_rate=0.0,
+                 timeout_rate=0.0, hang=30.0, change_every=None, seed=None):
+        super().__init__(listen, FakeSiteHandler)
+        self.pages = [self._load(page) for page in pages]
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.hang = hang
+        self.change_every = change_every
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.index = 0
+        self.modified = self.started  # Когда текущая страница стала текущей
+        self.stats = {'requests': 0, 'ok': 0, 'not_modified': 0, 'errors': 0, 'timeouts': 0}
+
+    @staticmethod
+    def _load(page):
+        if isinstance(page, bytes):
+            return page
+        with open(page, 'rb') as f:
+            return f.read()
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}{PATH}"
+
+    @property
+    def requests(self):
+        return self.stats['requests']
+
+    def count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    def roll(self):
+        """Исход очередного запроса: 200, код ошибки или 'timeout', и задержка."""
+        with self.lock:
+            self.stats['requests'] += 1
+            delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0)
+            value = self.random.random()
+            if value < self.timeout_rate:
+                self.stats['timeouts'] += 1
+                return 'timeout', delay
+            if value < self.timeout_rate + self.error_rate:
+                self.stats['errors'] += 1
+                return self.random.choice(ERROR_STATUSES), delay
+            return 200, delay
+
+    def set_page(self, index):
+        """Делает текущей страницу с номером index (смена замен вручную)."""
+        with self.lock:
+            index %= len(self.pages)
+            if index != self.index:
+                self.index = index
+                self.modified = time.time()
+
+    def next_page(self):
+        """Переключает на следующую страницу из списка."""
+        self.set_page(self.index + 1)
+
+    def current_page(self):
+        """(содержимое, ETag, время изменения) текущей страницы."""
+        if self.change_every:
+            elapsed = time.time() - self.started
+            self.set_page(int(elapsed // self.change_every))
+        with self.lock:
+            content = self.pages[self.index]
+            modified = self.modified
+        return content, '"%s"' % hashlib.sha1(content).hexdigest()[:16], modified
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальный заменитель сайта расписания")
+    parser.add_argument('pages', nargs='*', default=['fixtures/rasp_second.html'], help="страницы замен по очереди")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0.0, help="задержка ответа, с")
+    parser.add_argument('--jitter', type=float, default=0.0, help="случайная добавка к задержке, с")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="доля ответов 500/502/503/504")
+    parser.add_argument('--timeout-rate', type=float, default=0.0, help="доля запросов без ответа")
+    parser.add_argument('--hang', type=float, default=30.0, help="сколько молчать при тайм-ауте, с")
+    parser.add_argument('--change-every', type=float, default=None, help="смена страницы каждые N секунд")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    site = FakeSite(
+        args.pages, (args.host, args.port), args.latency, args.jitter, args.error_rate,
+        args.timeout_rate, args.hang, args.change_every, args.seed
+    )
+    print(f"Заменитель сайта: {site.url}")
+    try:
+        site.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        site.server_close()
+        print(f"Статистика: {site.stats}")
+
+if __name__ == '__main__':
+    main()
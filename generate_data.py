@@ -0,0 +1,165 @@
+"""Генератор синтетических расписаний и страниц замен для проверки на масштабе.
+
+В колледже около 50 групп и несколько десятков замен в день; этот скрипт
+строит данные в 10 и 100 раз больше, чтобы разбор, индексы и вывод
+расписаний можно было замерить (benchmark.py, loadtest.py, fake_site.py)
+на худшем случае:
+    расписания  N групп в формате timetables.json / timetables.bin
+                (группа -> день -> тип недели -> пара -> занятие);
+    страница    rasp_second.html с M строками замен, в том числе
+                с диапазонами пар "2-3", списками "2,4" и несколькими
+                группами в одной ячейке.
+
+Расписания по умолчанию пишутся в fixtures/, а не в timetables.bin
+рядом с ботом: бот читает этот файл первым и отвечал бы выдуманными
+расписаниями. Замеры на них — через benchmark.py --timetables.
+
+Запуск:
+    python generate_data.py --groups 510 --timetables fixtures/timetables_x10.bin
+    python generate_data.py --groups 510 --rows 800 --page fixtures/rasp_x10.html
+"""
+import os
+import json
+import random
+import argparse
+from datetime import date, timedelta
+
+from timetable_bin import write_timetables, DAYS, WEEK_TYPES
+
+PREFIXES = ("ИБ", "ИС", "КС", "ПК", "ЗИО", "ТМ", "ЭМ", "ОП", "БД", "АТ", "СА", "ЭК", "ТО", "СП", "МО")
+SUBJECTS = (
+    "Математика", "Физика", "Иностранный язык", "Основы алгоритмизации", "Сети и системы передачи информации",
+    "Физическая культура", "История", "Русский язык", "Криптографические средства защиты информации",
+    "Технические средства информатизации", "Электротехника", "Правовое обеспечение профессиональной деятельности",
+    "Операционные системы", "Базы данных", "Инженерная графика", "Экономика организации", "Химия", "Литература"
+)
+TEACHERS = (
+    "Иванова А.С.", "Петров В.Н.", "Сидорова Е.К.", "Кузнецов Д.А.", "Смирнова О.П.", "Волков И.И.",
+    "Орлова Н.В.", "Соколов М.Г.", "Лебедева Т.Ю.", "Новиков П.Р.", "Морозова Л.А.", "Павлов К.С."
+)
+CABINETS = ("101", "101а", "207", "214", "312", "315", "405", "410", "спортзал", "дист.")
+MONTHS = (
+    "января", "февраля", "марта", "апреля", "мая", "июня",
+    "июля", "августа", "сентября", "октября", "ноября", "декабря"
+)
+PAIRS = ("1", "2", "3", "4", "5")
+TIMETABLES = 'fixtures/timetables_synthetic.bin'  # Куда писать расписания по умолчанию
+BOT_TIMETABLES = ('timetables.bin', 'timetables.json')  # Файлы, которые читает бот (telbot.py)
+
+PAGE_HEAD = """<!DOCTYPE html>
+<html>
+<head>
+<meta http-equiv="Content-Type" content="text/html; charset=utf-8">
+<title>Изменения в расписании</title>
+<style>
+<!--
+p.MsoNormal {{margin:0cm; font-size:12.0pt; font-family:"Times New Roman";}}
+td {{border:solid windowtext 1.0pt; padding:0cm 5.4pt 0cm 5.4pt;}}
+-->
+</style>
+</head>
+<body lang="RU">
+<div align="center"><b><span style="font-size:14.0pt">Изменения в расписании на {date} / {day}</span></b></div>
+<div align="center"><span style="font-size:12.0pt">Неделя: {week_type}</span></div>
+<table border="1" cellspacing="0" cellpadding="0">
+<tr><td><p><b>№</b></p></td><td><p><b>Группа</b></p></td><td><p><b>Пара</b></p></td><td><p><b>Заменяемая дисциплина</b></p></td><td><p><b>Заменяющая дисциплина</b></p></td><td><p><b>Ауд.</b></p></td></tr>
+"""
+PAGE_TAIL = """</table>
+<div align="left"><p class="MsoNormal">Заведующий отделением</p></div>
+</body>
+</html>
+"""
+CELL = '<td class="td{0}"><p class="MsoNormal" align="center"><span style="font-size:10.0pt">{1}</span></p></td>'
+
+def group_names(count):
+    """count названий групп вида "ИБ1-41": направление, курс, номер."""
+    names = []
+    number = 0
+    while len(names) < count:
+        prefix = PREFIXES[number % len(PREFIXES)]
+        cycle = number // len(PREFIXES)
+        course = cycle % 4 + 1
+        names.append(f"{prefix}1-{course}{cycle // 4 + 1}")
+        number += 1
+    return names
+
+def generate_lesson(rng):
+    return {'name': rng.choice(SUBJECTS), 'teacher': rng.choice(TEACHERS), 'cab': rng.choice(CABINETS)}
+
+def generate_timetables(groups, rng):
+    """Расписания групп: 6 учебных дней, 2-5 пар, часть пар различается по неделям."""
+    timetables = {}
+    for group in groups:
+        days = {}
+        for day in DAYS[:6]:
+            first = rng.choice(("1", "1", "2"))
+            pairs = [str(pair) for pair in range(int(first), int(first) + rng.randint(2, 4))]
+            weeks = {week_type: {} for week_type in WEEK_TYPES}
+            for pair in pairs:
+                lesson = generate_lesson(rng)
+                for week_type in WEEK_TYPES:
+                    # Примерно каждая пятая пара разная в числитель и знаменатель
+                    weeks[week_type][pair] = lesson if rng.random() > 0.2 else generate_lesson(rng)
+            days[day] = weeks
+        timetables[group] = days
+    return timetables
+
+def pair_cell(rng):
+    """Номера пар: одиночная, диапазон "2-3" или список "2,4"."""
+    kind = rng.random()
+    if kind < 0.6:
+        return rng.choice(PAIRS)
+    if kind < 0.85:
+        start = rng.randint(1, len(PAIRS) - 1)
+        return f"{start}-{rng.randint(start + 1, len(PAIRS))}"
+    return ",".join(sorted(rng.sample(PAIRS, 2), key=int))
+
+def generate_page(groups, rows, rng, day=None):
+    """HTML страницы замен с rows строками на дату day (по умолчанию завтра)."""
+    day = day or date.today() + timedelta(days=1)
+    header = PAGE_HEAD.format(
+        date=f"{day.day} {MONTHS[day.month - 1]} {day.year} года",
+        day=DAYS[day.weekday()].lower(),
+        week_type=WEEK_TYPES[day.isocalendar()[1] % 2 == 0]
+    )
+    lines = []
+    for number in range(1, rows + 1):
+        cell_groups = rng.sample(groups, 2) if rng.random() < 0.15 and len(groups) > 1 else [rng.choice(groups)]
+        replacement = f"{rng.choice(SUBJECTS)} ({rng.choice(TEACHERS)})"
+        cells = (number, ", ".join(cell_groups), pair_cell(rng), rng.choice(SUBJECTS), replacement, rng.choice(CABINETS))
+        lines.append("<tr>" + "".join(CELL.format(index, value) for index, value in enumerate(cells)) + "</tr>")
+    return header + "\n".join(lines) + "\n" + PAGE_TAIL
+
+def main():
+    parser = argparse.ArgumentParser(description="Синтетические расписания и страницы замен")
+    parser.add_argument('--groups', type=int, default=510, help="число групп (в колледже ~51)")
+    parser.add_argument('--rows', type=int, default=800, help="строк на странице замен")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--timetables', default=TIMETABLES, help="куда записать расписания (.bin или .json)")
+    parser.add_argument('--page', help="куда записать страницу замен (.html)")
+    parser.add_argument('--no-timetables', action='store_true', help="только страница замен")
+    args = parser.parse_args()
+    if args.no_timetables:
+        args.timetables = None
+    elif os.path.abspath(args.timetables) in map(os.path.abspath, BOT_TIMETABLES):
+        parser.error(f"{args.timetables} читает бот: укажите другой файл и передайте его benchmark.py --timetables")
+
+    rng = random.Random(args.seed)
+    groups = group_names(args.groups)
+    if args.timetables:
+        timetables = generate_timetables(groups, rng)
+        if args.timetables.endswith('.bin'):
+            write_timetables(timetables, args.timetables)
+        else:
+            with open(args.timetables, 'w', encoding='utf-8') as f:
+                json.dump(timetables, f, ensure_ascii=False, separators=(',', ':'))
+        print(f"Расписания: {len(timetables)} групп -> {args.timetables}")
+    if args.page:
+        with open(args.page, 'w', encoding='utf-8') as f:
+            f.write(generate_page(groups, args.rows, rng))
+        print(f"Страница замен: {args.rows} строк -> {args.page}")
+    if not args.timetables and not args.page:
+        parser.error("укажите --page или уберите --no-timetables")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,12 @@
+"""Названия групп: шаблон и приведение к виду ключа индекса.
+
+Отдельный модуль без зависимостей, чтобы его могли импортировать и бот,
+и утилиты (xlsx_import.py), не поднимая бота целиком.
+"""
+import re
+
+GROUP_PATTERN = re.compile(r'[А-ЯЁA-Z]+\d*-\d+')
+
+def normalize_group(name):
+    """Приводит название группы к виду ключа индекса: "иб1 - 41" -> "ИБ1-41"."""
+    return re.sub(r'\s+', '', name).upper()
@@ -0,0 +1,50 @@
+"""Занятия и замены с общими строками.
+
+Названия дисциплин, преподаватели и кабинеты повторяются в расписаниях
+всех групп, в обеих неделях и в каждой странице замен. Строки проходят
+через sys.intern, а одинаковые занятия — через общую таблицу, поэтому
+каждая такая строка и каждое занятие хранятся в памяти один раз.
+Объекты Lesson неизменяемы по соглашению: их разделяют все группы.
+"""
+import sys
+import threading
+import weakref
+
+class Lesson:
+    """Занятие или замена: дисциплина, преподаватель, кабинет."""
+    __slots__ = ('name', 'teacher', 'cab', '__weakref__')
+
+    def __init__(self, name, teacher, cab):
+        self.name = name
+        self.teacher = teacher
+        self.cab = cab
+
+    def has_data(self):
+        """Есть ли что показать пользователю."""
+        return bool(self.name or self.teacher or self.cab)
+
+    def __repr__(self):
+        return f"Lesson({self.name!r}, {self.teacher!r}, {self.cab!r})"
+
+_lessons = weakref.WeakValueDictionary()  # (дисциплина, преподаватель, кабинет) -> Lesson
+_lock = threading.Lock()
+
+def intern_text(value):
+    """Возвращает общий экземпляр строки."""
+    return sys.intern(value) if value else ''
+
+def make_lesson(name='', teacher='', cab=''):
+    """Возвращает общий объект занятия для этих значений."""
+    key = (intern_text(name), intern_text(teacher), intern_text(cab))
+    with _lock:
+        lesson = _lessons.get(key)
+        if lesson is None:
+            lesson = Lesson(*key)
+            _lessons[key] = lesson
+    return lesson
+
+def lesson_from_dict(data):
+    """Занятие из словаря вида {'name': ..., 'teacher': ..., 'cab': ...}."""
+    return make_lesson(data.get('name', ''), data.get('teacher', ''), data.get('cab', ''))
+
+EMPTY_LESSON = make_lesson()
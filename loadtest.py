@@ -0,0 +1,185 @@
+"""Нагрузочный тест: перемена перед первой парой.
+
+Сотни студентов за короткое время нажимают "Сегодня" (часть — впервые
+отправляет /start). Скрипт подаёт
+синтетические обновления Telegram в обработчики бота (через
+bot.process_new_updates, как при long polling) и поднимает локально:
+    - поддельный Telegram Bot API, который принимает sendMessage и
+      запоминает, когда пришёл ответ каждому чату;
+    - заменитель сайта расписания (fake_site.py) со страницей из fixtures/.
+Реальные сайт и Telegram не используются.
+
+По итогам печатаются пропускная способность, p50/p99 задержки от
+получения обновления до ответа и число исходящих запросов к сайту
+и к Telegram.
+
+Запуск:
+    python loadtest.py --users 300 --duration 60
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import telebot
+from telebot.types import Update
+
+TEST_TOKEN = '123456:LOADTEST'
+# Бот создаётся при импорте telbot, и TeleBot проверяет формат токена
+os.environ.setdefault('TELBOT_TOKEN', TEST_TOKEN)
+
+import telbot
+from metrics import percentile
+from fake_site import FakeSite
+
+FIXTURE = 'fixtures/rasp_second.html'
+
+class QuietHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+class FakeTelegramHandler(QuietHandler):
+    """Метод Bot API из пути /bot<токен>/<метод>, параметры — из запроса или тела."""
+
+    def do_GET(self):
+        self.do_POST()
+
+    def do_POST(self):
+        server = self.server
+        method = self.path.rstrip('/').rsplit('/', 1)[-1].split('?', 1)[0]
+        params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            body = self.rfile.read(length).decode('utf-8')
+            if self.headers.get('Content-Type', '').startswith('application/json'):
+                params.update(json.loads(body))
+            else:
+                params.update({k: v[0] for k, v in parse_qs(body).items()})
+        if server.latency:
+            time.sleep(server.latency)
+        server.record(method, params)
+
+        result = True
+        if method == 'sendMessage':
+            result = {
+                'message_id': 1, 'date': int(time.time()),
+                'chat': {'id': int(params['chat_id']), 'type': 'private'},
+                'text': params.get('text', '')
+            }
+        elif method == 'getMe':
+            result = {'id': 123456, 'is_bot': True, 'first_name': 'Test', 'username': 'test_bot'}
+        data = json.dumps({'ok': True, 'result': result}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+class FakeTelegram(ThreadingHTTPServer):
+    """Поддельный Bot API с учётом запросов по методам и времени ответа чатам."""
+    daemon_threads = True
+
+    def __init__(self, latency=0.0):
+        super().__init__(('127.0.0.1', 0), FakeTelegramHandler)
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.calls = {}  # метод -> число запросов
+        self.replies = {}  # chat_id -> время первого ответа (perf_counter)
+
+    def record(self, method, params):
+        with self.lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+            if method == 'sendMessage':
+                self.replies.setdefault(int(params['chat_id']), time.perf_counter())
+
+    @property
+    def api_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/bot{{0}}/{{1}}"
+
+def make_update(update_id, chat_id, text):
+    """Синтетическое обновление с личным сообщением от пользователя chat_id."""
+    return Update.de_json({
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': {'id': chat_id, 'is_bot': False, 'first_name': 'Студент'},
+            'text': text
+        }
+    })
+
+def run(args):
+    telegram = FakeTelegram(args.telegram_latency)
+    site = FakeSite([args.fixture], latency=args.site_latency, error_rate=args.site_error_rate)
+    for server in (telegram, site):
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    workdir = tempfile.mkdtemp(prefix='loadtest-')
+    telebot.apihelper.API_URL = telegram.api_url
+    telbot.URL = site.url
+    telbot.users = telbot.UserStore(os.path.join(workdir, 'users.db'))
+    telbot.send_queue.rate = telbot.send_queue.burst = args.send_rate
+    telbot.send_queue.start()
+
+    first_chat = 100000
+    groups = ['ИБ1-41', 'ИБ1-42', 'ИС1-31', 'ИС1-32']
+    for number in range(args.users):
+        telbot.users.set_group(first_chat + number, groups[number % len(groups)])
+
+    sent = {}  # chat_id -> время отправки обновления (perf_counter)
+    start = time.perf_counter()
+    for number in range(args.users):
+        # Равномерно по перемене
+        delay = start + args.duration * number / args.users - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        chat_id = first_chat + number
+        sent[chat_id] = time.perf_counter()
+        text = '/start' if args.start_share and number % round(1 / args.start_share) == 0 else 'Сегодня'
+        telbot.bot.process_new_updates([make_update(number + 1, chat_id, text)])
+    submitted = time.perf_counter() - start
+
+    # Ждём, пока опустеют пул обработчиков и очередь отправки (отклонённые
+    # ограничением частоты обновления ответа не получат)
+    deadline = time.perf_counter() + args.drain
+    idle_checks = 0
+    while len(telegram.replies) < len(sent) and time.perf_counter() < deadline and idle_checks < 5:
+        time.sleep(0.05)
+        idle = not telbot.dispatcher.pending() and not any(telbot.send_queue.pending())
+        idle_checks = idle_checks + 1 if idle else 0
+    elapsed = max(telegram.replies.values(), default=start) - start
+
+    latencies = sorted((telegram.replies[chat] - sent[chat]) * 1000 for chat in sent if chat in telegram.replies)
+    print(f"Пользователей: {args.users}, обновления поданы за {submitted:.1f} с")
+    print(f"Получили ответ: {len(latencies)}, без ответа: {len(sent) - len(latencies)}")
+    if latencies:
+        print(f"Пропускная способность: {len(latencies) / elapsed:.1f} ответов/с")
+        print(
+            f"Задержка ответа, мс: p50 {percentile(latencies, 0.5):.0f}, "
+            f"p99 {percentile(latencies, 0.99):.0f}, макс {latencies[-1]:.0f}"
+        )
+    print(f"Запросов к сайту: {site.requests} {site.stats}")
+    print(f"Запросов к Telegram: {dict(sorted(telegram.calls.items()))}")
+    print(f"Ограничение частоты: {telbot.rate_limiter.get_stats()}")
+    print(f"Очередь отправки: {telbot.send_queue.get_stats()}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест обработчиков бота")
+    parser.add_argument('--users', type=int, default=300, help="сколько студентов нажмут кнопку")
+    parser.add_argument('--duration', type=float, default=60, help="за сколько секунд, с")
+    parser.add_argument('--start-share', type=float, default=0.1, help="доля пользователей, отправляющих /start")
+    parser.add_argument('--fixture', default=FIXTURE, help="страница замен для заменителя сайта")
+    parser.add_argument('--site-latency', type=float, default=0.3, help="задержка ответа сайта, с")
+    parser.add_argument('--site-error-rate', type=float, default=0.0, help="доля ответов сайта 5xx")
+    parser.add_argument('--telegram-latency', type=float, default=0.05, help="задержка ответа Bot API, с")
+    parser.add_argument('--send-rate', type=float, default=telbot.SEND_RATE, help="лимит исходящих сообщений в секунду")
+    parser.add_argument('--drain', type=float, default=60, help="сколько ждать последних ответов, с")
+    run(parser.parse_args())
+
+if __name__ == '__main__':
+    main()
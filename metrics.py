@@ -0,0 +1,174 @@
+"""Метрики горячего пути: гистограммы времени этапов и счётчики.
+
+Этапы оборачиваются в timed(имя) или instrument(имя, функция); время
+попадает в гистограмму с фиксированными корзинами, исключения — в
+счётчик <имя>_errors. Метрики отдаются в текстовом формате Prometheus
+на локальном HTTP-адресе (/metrics) и в виде сводки для команды /stats.
+"""
+import time
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PREFIX = 'ygk_bot_'
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)  # секунды
+
+class Histogram:
+    """Гистограмма длительностей с фиксированными корзинами."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.counts = [0] * (len(buckets) + 1)  # Последняя корзина — больше самой верхней границы
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def quantile(self, share):
+        """Оценка перцентиля линейной интерполяцией внутри корзины."""
+        with self.lock:
+            counts, total = list(self.counts), self.count
+        if not total:
+            return 0.0
+        rank = share * total
+        seen = 0
+        for index, count in enumerate(counts):
+            if count and seen + count >= rank:
+                low = self.buckets[index - 1] if index else 0.0
+                high = self.buckets[index] if index < len(self.buckets) else self.buckets[-1]
+                return low + (high - low) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+def percentile(values, share):
+    """Перцентиль отсортированного списка замеров (ближайший ранг); для benchmark.py и loadtest.py."""
+    index = min(len(values) - 1, max(0, round(share * len(values)) - 1))
+    return values[index]
+
+histograms = {}  # имя -> Histogram
+counters = {}  # имя -> значение
+collectors = []  # Функции, возвращающие словарь {имя: значение} на момент чтения
+registry_lock = threading.Lock()
+
+def histogram(name):
+    """Гистограмма по имени (создаётся при первом обращении)."""
+    result = histograms.get(name)
+    if result is None:
+        with registry_lock:
+            result = histograms.setdefault(name, Histogram())
+    return result
+
+def inc(name, value=1):
+    """Увеличивает счётчик."""
+    with registry_lock:
+        counters[name] = counters.get(name, 0) + value
+
+@contextmanager
+def timed(name):
+    """Замеряет время блока в гистограмму name, исключения — в счётчик name_errors."""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        inc(f'{name}_errors')
+        raise
+    finally:
+        histogram(name).observe(time.perf_counter() - start)
+
+def instrument(name, func):
+    """Обёртка функции, замеряющая каждый вызов."""
+    def wrapper(*args, **kwargs):
+        with timed(name):
+            return func(*args, **kwargs)
+    wrapper.__name__ = getattr(func, '__name__', name)
+    wrapper.__doc__ = func.__doc__
+    wrapper.__wrapped__ = func
+    return wrapper
+
+def timed_function(name):
+    """Декоратор: то же, что instrument."""
+    return lambda func: instrument(name, func)
+
+def add_collector(func):
+    """Регистрирует источник дополнительных значений (например, get_stats очередей)."""
+    collectors.append(func)
+
+def collect():
+    """Значения всех источников: {имя: число}."""
+    values = {}
+    for func in collectors:
+        try:
+            values.update(func())
+        except Exception as e:
+            print(f"Ошибка сбора метрик: {e}")
+    return values
+
+def render():
+    """Все метрики в текстовом формате Prometheus."""
+    lines = []
+    for name, hist in sorted(histograms.items()):
+        metric = f'{PREFIX}{name}_seconds'
+        with hist.lock:
+            counts, total, value_sum = list(hist.counts), hist.count, hist.sum
+        lines.append(f'# TYPE {metric} histogram')
+        cumulative = 0
+        for bound, count in zip(hist.buckets, counts):
+            cumulative += count
+            lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f'{metric}_bucket{{le="+Inf"}} {total}')
+        lines.append(f'{metric}_sum {value_sum:.6f}')
+        lines.append(f'{metric}_count {total}')
+    with registry_lock:
+        counter_items = sorted(counters.items())
+    for name, value in counter_items:
+        lines.append(f'# TYPE {PREFIX}{name}_total counter')
+        lines.append(f'{PREFIX}{name}_total {value}')
+    for name, value in sorted(collect().items()):
+        if isinstance(value, (int, float)):
+            lines.append(f'# TYPE {PREFIX}{name} gauge')
+            lines.append(f'{PREFIX}{name} {value}')
+    return '\n'.join(lines) + '\n'
+
+def summary():
+    """Сводка по этапам: [(имя, вызовов, p50 с, p99 с, ошибок)]."""
+    return [
+        (name, hist.count, hist.quantile(0.5), hist.quantile(0.99), counters.get(f'{name}_errors', 0))
+        for name, hist in sorted(histograms.items())
+    ]
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        data = render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_server(listen):
+    """Запускает HTTP-сервер /metrics в фоновом потоке. None, если адрес занят.
+
+    Без страницы метрик бот продолжает работать.
+    """
+    try:
+        server = ThreadingHTTPServer(listen, MetricsHandler)
+    except OSError as e:
+        print(f"Не удалось запустить сервер метрик на {listen[0]}:{listen[1]}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
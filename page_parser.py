@@ -0,0 +1,116 @@
+"""Извлечение данных со страницы замен rasp_second.html.
+
+Со страницы нужны только строки первой таблицы и тексты заголовков
+<div align="center">, поэтому полное дерево документа не строится.
+Способы разбора:
+    lxml         — C-парсер, используется, если установлен;
+    html.parser  — потоковый разбор стандартной библиотекой, который
+                   собирает только нужные элементы.
+"""
+from collections import namedtuple
+from html.parser import HTMLParser
+
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+# rows — строки первой таблицы (списки текстов ячеек <td>) или None, если таблицы нет;
+# headers — тексты всех <div align="center">
+Page = namedtuple('Page', 'rows headers')
+
+class PageExtractor(HTMLParser):
+    """Потоковый сборщик первой таблицы и заголовков div[align=center]."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows = None
+        self.headers = []
+        self.table_depth = 0  # Вложенность таблиц внутри первой таблицы
+        self.table_done = False
+        self.row = None
+        self.cell = None
+        self.div_depth = 0  # Вложенность div внутри заголовка
+        self.header = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'table':
+            if self.table_depth:
+                self.table_depth += 1
+            elif not self.table_done:
+                self.table_depth = 1
+                self.rows = []
+        elif self.table_depth and tag == 'tr':
+            self._close_row()
+            self.row = []
+        elif self.table_depth and tag == 'td':
+            self._close_cell()
+            if self.row is None:
+                self.row = []
+            self.cell = []
+        elif tag == 'div':
+            if self.header is not None:
+                self.div_depth += 1
+            elif ('align', 'center') in attrs:
+                self.header = []
+                self.div_depth = 1
+
+    def handle_endtag(self, tag):
+        if tag == 'table' and self.table_depth:
+            self.table_depth -= 1
+            if not self.table_depth:
+                self._close_row()
+                self.table_done = True
+        elif tag == 'tr' and self.table_depth:
+            self._close_row()
+        elif tag == 'td' and self.table_depth:
+            self._close_cell()
+        elif tag == 'div' and self.header is not None:
+            self.div_depth -= 1
+            if not self.div_depth:
+                self.headers.append(''.join(self.header))
+                self.header = None
+
+    def handle_data(self, data):
+        if self.cell is not None:
+            self.cell.append(data)
+        if self.header is not None:
+            self.header.append(data)
+
+    def _close_cell(self):
+        if self.cell is not None:
+            self.row.append(''.join(self.cell))
+            self.cell = None
+
+    def _close_row(self):
+        self._close_cell()
+        if self.row is not None:
+            self.rows.append(self.row)
+            self.row = None
+
+def extract_stdlib(html):
+    """Разбор потоковым html.parser."""
+    extractor = PageExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return Page(extractor.rows, extractor.headers)
+
+def extract_lxml(html):
+    """Разбор через lxml."""
+    document = lxml.html.fromstring(html)
+    table = next(document.iter('table'), None)
+    rows = None
+    if table is not None:
+        rows = [[td.text_content() for td in tr.iter('td')] for tr in table.iter('tr')]
+    headers = [div.text_content() for div in document.iter('div') if div.get('align') == 'center']
+    return Page(rows, headers)
+
+PARSERS = {'html.parser': extract_stdlib}
+if lxml is not None:
+    PARSERS['lxml'] = extract_lxml
+
+def get_parser(name='auto'):
+    """Возвращает функцию разбора по имени; 'auto' — самая быстрая из доступных."""
+    if name == 'auto':
+        return PARSERS.get('lxml', extract_stdlib)
+    return PARSERS[name]
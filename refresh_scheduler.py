@@ -0,0 +1,135 @@
+"""Адаптивный период фонового обновления страницы замен.
+
+Замены публикуются в предсказуемое время: утром перед первой парой и днём
+на следующий день. В эти окна страница проверяется часто (min_interval),
+в остальное время (ночью, в воскресенье) период после каждой проверки без
+изменений удваивается до max_interval, но к началу ближайшего окна
+проверка всё равно происходит.
+
+Утреннее окно выводится из расписания звонков: lead_minutes до начала
+первой пары (first_pair), когда выкладывают последние замены на сегодня.
+Дневные окна задаются заранее (windows). Все окна дополняются по
+наблюдениям: время каждого изменения страницы запоминается с точностью
+до слота (slot_minutes) в разрезе дня недели, и слот, где изменения
+случались не реже learn_min раз, вместе с предыдущим слотом тоже
+считается окном.
+Статистика хранится в JSON-файле и переживает перезапуск.
+"""
+import os
+import json
+import tempfile
+import threading
+from datetime import timedelta
+
+MINUTES_PER_DAY = 24 * 60
+DECAY_LIMIT = 50  # Когда счётчик слота достигает этого значения, вся статистика делится пополам
+
+def parse_window(text):
+    """"07:00-08:30" -> (420, 510) в минутах от начала дня."""
+    start, end = text.split('-')
+    return tuple(int(hours) * 60 + int(minutes) for hours, minutes in (part.split(':') for part in (start, end)))
+
+def morning_window(first_pair, lead_minutes):
+    """Окно перед первой парой: ("08:30", 90) -> (420, 510)."""
+    hours, minutes = first_pair.split(':')
+    start = int(hours) * 60 + int(minutes)
+    return max(start - lead_minutes, 0), start
+
+class RefreshScheduler:
+    """Выбирает паузу до следующей проверки страницы."""
+
+    def __init__(self, path, min_interval=60, max_interval=3600, windows=(), weekdays=range(6),
+                 slot_minutes=30, learn_min=2, first_pair=None, lead_minutes=90):
+        self.path = path
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.windows = [parse_window(window) for window in windows]
+        if first_pair:
+            self.windows.append(morning_window(first_pair, lead_minutes))
+        self.weekdays = set(weekdays)
+        self.slot_minutes = slot_minutes
+        self.learn_min = learn_min
+        self.lock = threading.Lock()
+        self.changes = None  # "день недели:слот" -> число изменений, загружается при первом обращении
+        self.idle_interval = min_interval
+
+    def _load(self):
+        if self.changes is not None:
+            return
+        self.changes = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.changes = json.load(f).get('changes', {})
+            except Exception as e:
+                print(f"Ошибка загрузки статистики обновлений: {e}")
+
+    def _save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'changes': self.changes}, f)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def slot_key(self, when):
+        """Ключ слота статистики для момента времени."""
+        minute = when.hour * 60 + when.minute
+        return f"{when.weekday()}:{minute // self.slot_minutes}"
+
+    def record_change(self, when):
+        """Запоминает, что страница изменилась в момент when."""
+        with self.lock:
+            self._load()
+            key = self.slot_key(when)
+            self.changes[key] = self.changes.get(key, 0) + 1
+            if self.changes[key] >= DECAY_LIMIT:
+                # Старые наблюдения постепенно забываются, если расписание публикаций сменилось
+                self.changes = {k: v // 2 for k, v in self.changes.items() if v // 2}
+            self.idle_interval = self.min_interval
+            try:
+                self._save()
+            except Exception as e:
+                print(f"Ошибка сохранения статистики обновлений: {e}")
+
+    def in_window(self, when):
+        """Попадает ли момент в окно публикации (заданное или выученное)."""
+        minute = when.hour * 60 + when.minute
+        if when.weekday() in self.weekdays and any(start <= minute < end for start, end in self.windows):
+            return True
+        slot = minute // self.slot_minutes
+        slots_per_day = MINUTES_PER_DAY // self.slot_minutes
+        for offset in (0, 1):  # Текущий слот и следующий: начинаем чаще проверять заранее
+            day, next_slot = divmod(slot + offset, slots_per_day)
+            key = f"{(when.weekday() + day) % 7}:{next_slot}"
+            if self.changes.get(key, 0) >= self.learn_min:
+                return True
+        return False
+
+    def seconds_to_window(self, now, limit):
+        """Секунды до начала ближайшего окна, но не больше limit."""
+        step = timedelta(minutes=1)
+        moment = now.replace(second=0, microsecond=0) + step
+        while (moment - now).total_seconds() < limit:
+            if self.in_window(moment):
+                return (moment - now).total_seconds()
+            moment += step
+        return limit
+
+    def next_delay(self, now):
+        """Пауза в секундах до следующей проверки после проверки в момент now.
+
+        Вне окон каждая проверка без изменений удваивает паузу; изменение
+        страницы (record_change) сбрасывает её к min_interval.
+        """
+        with self.lock:
+            self._load()
+            if self.in_window(now):
+                self.idle_interval = self.min_interval
+                return self.min_interval
+            delay = self.idle_interval
+            self.idle_interval = min(self.idle_interval * 2, self.max_interval)
+            return max(self.seconds_to_window(now, delay), 1)
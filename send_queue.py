@@ -0,0 +1,151 @@
+"""Очередь исходящих сообщений с учётом лимитов Telegram.
+
+Telegram отвечает 429, если бот отправляет больше ~30 сообщений в
+секунду всего или больше ~1 сообщения в секунду в один чат. Очередь
+рассылает сообщения из нескольких потоков, но не быстрее этих лимитов:
+    - общая маркерная корзина (token bucket) на весь бот;
+    - не чаще одного сообщения в chat_interval секунд в каждый чат,
+      сообщения одного чата уходят по порядку;
+    - ответы пользователям (PRIORITY_REPLY) уходят раньше рассылок
+      (PRIORITY_BROADCAST);
+    - при 429 отправка приостанавливается на retry_after секунд из ответа,
+      а сообщение возвращается в начало своей очереди.
+"""
+import time
+import threading
+from collections import deque
+
+from telebot.apihelper import ApiTelegramException
+
+PRIORITY_REPLY = 0
+PRIORITY_BROADCAST = 1
+SCAN_LIMIT = 200  # Сколько сообщений просматривать в поисках чата, готового к отправке
+
+class SendQueue:
+    """Очередь отправки с приоритетами и рабочими потоками."""
+
+    def __init__(self, send, rate=30, burst=30, chat_interval=1.0, workers=4, max_attempts=3):
+        self.send_func = send
+        self.rate = rate
+        self.burst = burst
+        self.chat_interval = chat_interval
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.cond = threading.Condition()
+        self.lanes = (deque(), deque())  # По приоритетам: ответы, рассылки
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0  # До какого момента Telegram просил не отправлять (429)
+        self.chat_ready = {}  # chat_id -> когда можно отправлять следующее сообщение
+        self.busy_chats = set()  # Чаты, сообщение в которые сейчас отправляется
+        self.threads = []
+        self.stats = {'sent': 0, 'retried': 0, 'failed': 0, 'throttled': 0}
+
+    def start(self):
+        """Запускает рабочие потоки (повторный вызов ничего не делает)."""
+        with self.cond:
+            if self.threads:
+                return
+            for _ in range(self.workers):
+                thread = threading.Thread(target=self._worker, daemon=True)
+                thread.start()
+                self.threads.append(thread)
+
+    def send(self, chat_id, text, priority=PRIORITY_REPLY, **kwargs):
+        """Ставит сообщение в очередь. Аргументы те же, что у bot.send_message."""
+        with self.cond:
+            self.lanes[priority].append([chat_id, text, kwargs, 0])
+            self.cond.notify()
+
+    def pending(self):
+        """Число сообщений в очереди по приоритетам."""
+        with self.cond:
+            return tuple(len(lane) for lane in self.lanes)
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _take(self, now):
+        """Выбирает сообщение, которое можно отправить сейчас.
+
+        Возвращает (сообщение, приоритет) или (None, сколько ждать).
+        """
+        if now < self.paused_until:
+            return None, self.paused_until - now
+        self._refill(now)
+        if self.tokens < 1:
+            return None, (1 - self.tokens) / self.rate
+
+        wait = None
+        for priority, lane in enumerate(self.lanes):
+            seen = set()
+            for position, item in enumerate(lane):
+                if position >= SCAN_LIMIT:
+                    break
+                chat_id = item[0]
+                if chat_id in seen or chat_id in self.busy_chats:
+                    seen.add(chat_id)  # Сообщения одного чата — строго по порядку
+                    continue
+                seen.add(chat_id)
+                ready = self.chat_ready.get(chat_id, 0)
+                if ready > now:
+                    wait = ready - now if wait is None else min(wait, ready - now)
+                    continue
+                del lane[position]
+                self.tokens -= 1
+                self.busy_chats.add(chat_id)
+                return item, priority
+        return None, wait
+
+    def _worker(self):
+        while True:
+            with self.cond:
+                while True:
+                    item, result = self._take(time.monotonic())
+                    if item is not None:
+                        break
+                    if result is not None:
+                        self.stats['throttled'] += 1
+                    self.cond.wait(result)
+            self._deliver(item, result)
+
+    def _deliver(self, item, priority):
+        chat_id, text, kwargs, attempts = item
+        retry_after = None
+        try:
+            self.send_func(chat_id, text, **kwargs)
+            outcome = 'sent'
+        except ApiTelegramException as e:
+            if e.error_code == 429:
+                retry_after = (e.result_json or {}).get('parameters', {}).get('retry_after', 1)
+            outcome = 'retry' if e.error_code >= 500 else 'failed'
+            error = e
+        except Exception as e:
+            outcome, error = 'retry', e
+
+        now = time.monotonic()
+        with self.cond:
+            self.busy_chats.discard(chat_id)
+            self.chat_ready[chat_id] = now + self.chat_interval
+            if len(self.chat_ready) > 10000:
+                self.chat_ready = {k: v for k, v in self.chat_ready.items() if v > now}
+            if retry_after is not None:
+                self.paused_until = max(self.paused_until, now + retry_after)
+                self.lanes[priority].appendleft(item)  # 429 — не ошибка, попытка не считается
+                self.stats['retried'] += 1
+            elif outcome == 'retry' and attempts + 1 < self.max_attempts:
+                item[3] = attempts + 1
+                self.lanes[priority].appendleft(item)
+                self.stats['retried'] += 1
+            elif outcome == 'sent':
+                self.stats['sent'] += 1
+            else:
+                self.stats['failed'] += 1
+                print(f"Ошибка отправки сообщения {chat_id}: {error}")
+            self.cond.notify_all()
+
+    def get_stats(self):
+        """Счётчики для мониторинга."""
+        with self.cond:
+            return {**self.stats, 'reply_queue': len(self.lanes[0]), 'broadcast_queue': len(self.lanes[1])}
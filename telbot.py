@@ -1,7 +1,11 @@
 import os
+import atexit
+import copy
+import hashlib
 import requests
-from bs4 import BeautifulSoup
 import json
+import tempfile
+import sqlite3
 from datetime import datetime, timedelta
 import telebot
 from telebot.types import ReplyKeyboardMarkup, KeyboardButton
@@ -10,15 +14,63 @@ import locale
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 import threading
+from collections import OrderedDict
+from timetable_bin import TimetableFile
+from lessons import EMPTY_LESSON, make_lesson, lesson_from_dict
+from groups import GROUP_PATTERN, normalize_group
+from page_parser import get_parser
+from send_queue import SendQueue, PRIORITY_BROADCAST
+from webhook import run_webhook
+from dispatcher import ChatDispatcher
+from refresh_scheduler import RefreshScheduler
+import metrics
 
 # Настройки
 locale.setlocale(locale.LC_TIME, 'ru_RU.UTF-8')
-JSON_FILE = 'test23.json'
+JSON_FILE = 'test23.json'  # Расписание группы GROUP_NAME, если нет файлов со всеми группами
+TIMETABLES_BIN = 'timetables.bin'  # Расписания всех групп, собирается xlsx_import.py
+TIMETABLES_FILE = 'timetables.json'  # То же в JSON
 CUSTOM_REPLACEMENTS_FILE = 'custom_replacements.json'
+USERS_DB = 'users.db'
 URL = "https://menu.sttec.yar.ru/timetable/rasp_second.html"
-GROUP_NAME = "ИБ1-41"
-TOKEN = ''
+HTML_PARSER = 'auto'  # 'lxml', 'html.parser' или 'auto' (lxml, если установлен)
+GROUP_NAME = "ИБ1-41"  # Группа по умолчанию
+TOKEN = os.environ.get('TELBOT_TOKEN', '')  # Или задайте переменную окружения TELBOT_TOKEN
 ADMINS = []  # Замените на ваш chat_id
+REFRESH_MIN_INTERVAL = 90  # Период фонового обновления в окна публикации замен, секунды
+REFRESH_MAX_INTERVAL = 3600  # Предельный период вне окон (ночью, в воскресенье), секунды
+FIRST_PAIR_START = "08:30"  # Начало первой пары по расписанию звонков
+FIRST_PAIR_LEAD = 90  # За сколько минут до первой пары выкладывают утренние замены
+PUBLISH_WINDOWS = ("13:00-16:00",)  # Когда ещё выкладывают замены (пн-сб): днём на завтра
+REFRESH_STATS_FILE = 'refresh_stats.json'  # Когда страница менялась раньше
+CACHE_MAX_AGE = 600  # Возраст снимка, после которого он обновляется в фоне, секунды
+REFRESH_RETRY_DELAY = 60  # Пауза перед фоновым обновлением после ошибки загрузки, секунды
+SNAPSHOT_WAIT_TIMEOUT = 10  # Сколько ждать идущую загрузку, если снимка ещё нет, секунды
+USERS_FLUSH_INTERVAL = 10  # Период записи настроек пользователей на диск, секунды
+USER_RATE = 0.2  # Запросов в секунду на пользователя (1 раз в 5 секунд)
+USER_BURST = 2  # Сколько запросов подряд можно сделать без ожидания
+GLOBAL_RATE = 20  # Запросов в секунду на всего бота
+GLOBAL_BURST = 60
+MAX_TRACKED_USERS = 10000  # Верхняя граница числа корзин в памяти
+DAY_BUTTONS = {"сегодня": 0, "завтра": 1}  # Текст кнопки -> смещение в днях
+SEND_RATE = 25  # Исходящих сообщений в секунду на весь бот (лимит Telegram ~30)
+CHAT_SEND_INTERVAL = 1.0  # Не чаще одного сообщения в чат за столько секунд
+SEND_WORKERS = 4  # Потоков отправки сообщений
+WEBHOOK_URL = ''  # Публичный HTTPS-адрес webhook; пусто — long polling
+WEBHOOK_LISTEN = ('127.0.0.1', 8080)  # Где слушает локальный сервер webhook
+WEBHOOK_SECRET = ''  # Секрет из заголовка X-Telegram-Bot-Api-Secret-Token
+HANDLER_WORKERS = 8  # Потоков обработки обновлений
+HANDLER_QUEUE = 100  # Сколько обновлений может обрабатываться и ждать одновременно
+METRICS_LISTEN = ('127.0.0.1', 9321)  # Адрес страницы /metrics для Prometheus; None — не запускать
+
+# Тексты ответов
+WELCOME_TEXT = "📅 *Расписание занятий*\nВыберите день или укажите группу командой /group:"
+REPLACEMENT_PROMPT = (
+    "Введите номер пары и замену в формате:\n`3 Математика 207`\n"
+    "Для другой группы укажите её первой: `ИС1-31 3 Математика 207`"
+)
+UNKNOWN_INPUT_TEXT = "ℹ️ Используйте кнопки для выбора"
+SITE_UNAVAILABLE_TEXT = "⚠️ Сервер с расписанием временно недоступен. Попробуйте позже."
 
 # Настройка повторных попыток для HTTP-запросов
 SESSION = requests.Session()
@@ -28,29 +80,287 @@ retries = Retry(
     status_forcelist=[500, 502, 503, 504]
 )
 SESSION.mount('https://', HTTPAdapter(max_retries=retries))
+SESSION.mount('http://', HTTPAdapter(max_retries=retries))  # Локальный заменитель сайта (fake_site.py)
 
 # Инициализация бота
-bot = telebot.TeleBot(TOKEN)
-last_request_time = {}
+bot = telebot.TeleBot(TOKEN, threaded=False)  # Обработчики запускает dispatcher
+
+def acknowledge_updates(update_id):
+    """Сдвигает offset getUpdates: обновления уже в пуле, повторно их не запрашиваем."""
+    bot.last_update_id = max(bot.last_update_id, update_id)
+
+dispatcher = ChatDispatcher(
+    metrics.instrument('handle_update', bot.process_new_updates), HANDLER_WORKERS, HANDLER_QUEUE,
+    acknowledge_updates
+)
+bot.process_new_updates = dispatcher.process_new_updates  # Long polling тоже идёт через пул
+send_queue = SendQueue(
+    metrics.instrument('telegram_send', bot.send_message), SEND_RATE, SEND_RATE, CHAT_SEND_INTERVAL, SEND_WORKERS
+)
+cache_lock = threading.Lock()
+fetch_lock = threading.Lock()  # Одна загрузка страницы за раз, остальные ждут её результат
+refresh_state = {
+    'generation': 0,  # Число завершённых загрузок
+    'background': False,  # Идёт ли фоновое обновление
+    'next_try': 0  # Раньше этого момента (monotonic) фоновое обновление не запускается
+}
 cache = {
+    'snapshot': None,
     'replacements': None,
     'date': None,
     'week_type': None,
-    'last_update': None
+    'last_update': None,
+    'custom_version': 0
+}
+custom_lock = threading.Lock()
+custom_replacements = {
+    'data': None,  # группа -> пара -> замена, загружается при первом обращении
+    'pruned': None  # дата последней очистки устаревших замен
+}
+timetable = {
+    'source': None,  # (файл, mtime) загруженного расписания
+    'groups': {}  # группа -> день -> тип недели -> номер пары -> занятие (или TimetableFile)
 }
+rendered_cache = {
+    'version': None,  # (хэш страницы, версия своих замен, дата, источник расписания)
+    'messages': {}  # (группа, день, тип недели) -> готовый текст
+}
+
+# -------------------------------
+# Настройки пользователей
+# -------------------------------
+
+class UserStore:
+    """Группы пользователей в SQLite с кэшем в памяти и отложенной записью.
+
+    Таблица читается целиком при первом обращении, дальше чтения идут из
+    памяти, а изменения копятся и сбрасываются на диск методом flush().
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = None
+        self.groups = None  # chat_id -> группа
+        self.members = {}  # группа -> множество chat_id
+        self.dirty = set()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS users ("
+            "chat_id INTEGER PRIMARY KEY, group_name TEXT NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_users_group ON users(group_name)")
+        conn.commit()
+        return conn
+
+    def _load(self):
+        """Загружает таблицу в память при первом обращении."""
+        if self.groups is not None:
+            return
+        self.conn = self._connect()
+        self.groups = dict(self.conn.execute("SELECT chat_id, group_name FROM users"))
+        for chat_id, group in self.groups.items():
+            self.members.setdefault(group, set()).add(chat_id)
+
+    def get_group(self, chat_id, default=None):
+        """Возвращает группу пользователя без обращения к диску."""
+        if self.groups is None:
+            with self.lock:
+                self._load()
+        return self.groups.get(chat_id, default)
+
+    def set_group(self, chat_id, group):
+        """Запоминает группу пользователя; на диск она попадёт при flush()."""
+        group = normalize_group(group)
+        with self.lock:
+            self._load()
+            old_group = self.groups.get(chat_id)
+            if old_group == group:
+                return
+            if old_group is not None:
+                self.members[old_group].discard(chat_id)
+            self.groups[chat_id] = group
+            self.members.setdefault(group, set()).add(chat_id)
+            self.dirty.add(chat_id)
+
+    def chats_in_group(self, group):
+        """Возвращает chat_id всех подписчиков группы."""
+        with self.lock:
+            self._load()
+            return set(self.members.get(normalize_group(group), ()))
+
+    def flush(self):
+        """Записывает накопленные изменения на диск одной транзакцией."""
+        with self.lock:
+            if not self.dirty:
+                return
+            rows = [(chat_id, self.groups[chat_id]) for chat_id in self.dirty]
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT INTO users (chat_id, group_name) VALUES (?, ?) "
+                    "ON CONFLICT(chat_id) DO UPDATE SET group_name = excluded.group_name",
+                    rows
+                )
+            self.dirty.clear()
+
+users = UserStore(USERS_DB)
+
+# -------------------------------
+# Ограничение частоты запросов
+# -------------------------------
+
+class RateLimiter:
+    """Маркерные корзины (token bucket) на пользователя и на весь бот.
+
+    Корзина, простоявшая дольше burst / rate секунд, заполнена целиком и
+    ничем не отличается от отсутствующей, поэтому такие записи удаляются.
+    Число записей дополнительно ограничено max_users (вытесняются самые
+    давние).
+    """
+
+    def __init__(self, user_rate, user_burst, global_rate, global_burst, max_users):
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.global_rate = global_rate
+        self.global_burst = global_burst
+        self.max_users = max_users
+        self.idle_ttl = user_burst / user_rate
+        self.lock = threading.Lock()
+        self.buckets = OrderedDict()  # user_id -> [маркеры, время, предупреждён]
+        self.global_tokens = global_burst
+        self.global_updated = time.monotonic()
+        self.stats = {'allowed': 0, 'limited_user': 0, 'limited_global': 0, 'evicted': 0}
+
+    def _evict(self, now):
+        """Удаляет простаивающие корзины и лишние сверх max_users."""
+        while self.buckets:
+            user_id, bucket = next(iter(self.buckets.items()))
+            if now - bucket[1] < self.idle_ttl and len(self.buckets) < self.max_users:
+                break
+            del self.buckets[user_id]
+            self.stats['evicted'] += 1
+
+    def check(self, user_id):
+        """Проверяет запрос пользователя.
+
+        Возвращает (вердикт, ожидание, предупредить). Вердикт 'ok' — запрос
+        разрешён, 'user' — пользователь превысил лимит и может повторить
+        через «ожидание» секунд, 'global' — бот перегружен. Предупреждать
+        пользователя нужно один раз за серию отклонённых запросов.
+        """
+        now = time.monotonic()
+        with self.lock:
+            self._evict(now)
+            bucket = self.buckets.pop(user_id, None)
+            if bucket is None:
+                bucket = [self.user_burst, now, False]
+            else:
+                bucket[0] = min(self.user_burst, bucket[0] + (now - bucket[1]) * self.user_rate)
+                bucket[1] = now
+            self.buckets[user_id] = bucket
+
+            if bucket[0] < 1:
+                self.stats['limited_user'] += 1
+                warn = not bucket[2]
+                bucket[2] = True
+                return 'user', (1 - bucket[0]) / self.user_rate, warn
+
+            self.global_tokens = min(
+                self.global_burst,
+                self.global_tokens + (now - self.global_updated) * self.global_rate
+            )
+            self.global_updated = now
+            if self.global_tokens < 1:
+                self.stats['limited_global'] += 1
+                return 'global', 0, False
+
+            self.global_tokens -= 1
+            bucket[0] -= 1
+            bucket[2] = False
+            self.stats['allowed'] += 1
+            return 'ok', 0, False
+
+    def get_stats(self):
+        """Счётчики для мониторинга."""
+        with self.lock:
+            return {**self.stats, 'tracked_users': len(self.buckets)}
+
+rate_limiter = RateLimiter(USER_RATE, USER_BURST, GLOBAL_RATE, GLOBAL_BURST, MAX_TRACKED_USERS)
+refresh_scheduler = RefreshScheduler(
+    REFRESH_STATS_FILE, REFRESH_MIN_INTERVAL, REFRESH_MAX_INTERVAL, PUBLISH_WINDOWS,
+    first_pair=FIRST_PAIR_START, lead_minutes=FIRST_PAIR_LEAD
+)
+
+def runtime_stats():
+    """Текущие значения очередей, лимитов и кэша для метрик."""
+    values = {f'rate_limiter_{k}': v for k, v in rate_limiter.get_stats().items()}
+    values.update({f'send_queue_{k}': v for k, v in send_queue.get_stats().items()})
+    values.update({f'dispatcher_{k}': v for k, v in dispatcher.stats.items()})
+    values['dispatcher_busy_chats'] = dispatcher.pending()
+    snapshot = cache['snapshot']
+    if snapshot:
+        values['snapshot_age_seconds'] = round((datetime.now() - snapshot.fetched_at).total_seconds(), 1)
+    return values
+
+metrics.add_collector(runtime_stats)
 
 # -------------------------------
 # Основные функции
 # -------------------------------
 
-def load_schedule():
-    """Загружает расписание из JSON-файла."""
+def compile_schedule(data):
+    """Преобразует список дней из JSON в индекс день -> тип недели -> пары по порядку."""
+    days = {}
+    for entry in data:
+        for day, weeks in entry.items():
+            days[day] = {
+                week_type: {
+                    pair: lesson_from_dict(lesson)
+                    for pair, lesson in sorted(pairs.items(), key=lambda item: int(item[0]))
+                }
+                for week_type, pairs in weeks.items()
+            }
+    return days
+
+def load_timetables():
+    """Загружает расписания всех групп, перечитывая файл только при его изменении.
+
+    Источники по приоритету: TIMETABLES_BIN (отображается в память и
+    читается лениво), TIMETABLES_FILE, JSON_FILE с расписанием одной
+    группы GROUP_NAME.
+    """
+    path = next((p for p in (TIMETABLES_BIN, TIMETABLES_FILE) if os.path.exists(p)), JSON_FILE)
+    mtime = os.path.getmtime(path)
+    if (path, mtime) == timetable['source']:
+        return timetable['groups']
+
+    if path == TIMETABLES_BIN:
+        timetable['groups'] = TimetableFile(path)
+        timetable['source'] = (path, mtime)
+        return timetable['groups']
+
+    with open(path, 'r', encoding='utf-8') as file:
+        data = json.load(file)
+    if path == JSON_FILE:
+        groups = {normalize_group(GROUP_NAME): compile_schedule(data)}
+    else:
+        groups = {normalize_group(group): compile_schedule([days]) for group, days in data.items()}
+    timetable['groups'] = groups
+    timetable['source'] = (path, mtime)
+    return groups
+
+@metrics.timed_function('load_schedule')
+def load_schedule(group=GROUP_NAME):
+    """Возвращает расписание группы: день -> тип недели -> пары по порядку."""
     try:
-        with open(JSON_FILE, 'r', encoding='utf-8') as file:
-            return json.load(file)
+        load_timetables()
     except Exception as e:
         print(f"Ошибка загрузки JSON: {e}")
-        return []
+    return timetable['groups'].get(normalize_group(group), {})
 
 def load_custom_replacements_raw():
     """Загружает пользовательские замены."""
@@ -63,186 +373,413 @@ def load_custom_replacements_raw():
         print(f"Ошибка загрузки кастомных замен: {e}")
         return {}
 
-def load_custom_replacements():
+def get_custom_replacements_data():
+    """Возвращает пользовательские замены из памяти, загружая файл при первом обращении."""
+    if custom_replacements['data'] is None:
+        with custom_lock:
+            if custom_replacements['data'] is None:
+                custom_replacements['data'] = load_custom_replacements_raw()
+    return custom_replacements['data']
+
+def prune_custom_replacements(today):
+    """Удаляет замены за прошедшие дни. Выполняется один раз в день при чтении."""
+    with custom_lock:
+        if custom_replacements['pruned'] == today:
+            return
+        data = custom_replacements['data']
+        pruned = {}
+        for group, pairs in data.items():
+            actual = {k: v for k, v in pairs.items() if v.get('date', '') >= today}
+            if actual:
+                pruned[group] = actual
+        if pruned != data:
+            custom_replacements['data'] = pruned
+            cache['custom_version'] += 1
+            try:
+                save_custom_replacements(pruned)
+            except Exception as e:
+                print(f"Ошибка сохранения кастомных замен: {e}")
+        custom_replacements['pruned'] = today
+
+def load_custom_replacements(group=GROUP_NAME):
     """Загружает актуальные пользовательские замены."""
-    custom = load_custom_replacements_raw()
+    data = get_custom_replacements_data()
     today = datetime.now().strftime("%Y-%m-%d")
-    return {k: v for k, v in custom.get(GROUP_NAME, {}).items() if v.get('date') == today}
+    if custom_replacements['pruned'] != today:
+        prune_custom_replacements(today)
+        data = custom_replacements['data']
+    return {
+        k: make_lesson(v.get('name', ''), cab=v.get('cab', ''))
+        for k, v in data.get(normalize_group(group), {}).items() if v.get('date') == today
+    }
 
 def save_custom_replacements(data):
-    """Сохраняет пользовательские замены."""
-    with open(CUSTOM_REPLACEMENTS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    """Атомарно сохраняет пользовательские замены через временный файл."""
+    directory = os.path.dirname(os.path.abspath(CUSTOM_REPLACEMENTS_FILE))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, CUSTOM_REPLACEMENTS_FILE)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
 
-def save_custom_replacement(pair, data):
+def save_custom_replacement(pair, data, group=GROUP_NAME):
     """Сохраняет одну пользовательскую замену."""
-    custom = load_custom_replacements_raw()
-    if GROUP_NAME not in custom:
-        custom[GROUP_NAME] = {}
-    custom[GROUP_NAME][pair] = {
-        'name': data['name'],
-        'cab': data['cab'],
-        'date': datetime.now().strftime("%Y-%m-%d")  # Добавляем дату замены
-    }
-    save_custom_replacements(custom)
+    group = normalize_group(group)
+    get_custom_replacements_data()
+    with custom_lock:
+        custom = dict(custom_replacements['data'])
+        custom[group] = {
+            **custom.get(group, {}),
+            pair: {
+                'name': data['name'],
+                'cab': data['cab'],
+                'date': datetime.now().strftime("%Y-%m-%d")  # Добавляем дату замены
+            }
+        }
+        save_custom_replacements(custom)
+        custom_replacements['data'] = custom
+        cache['custom_version'] += 1
+
+class PageSnapshot:
+    """Снимок страницы замен: один запрос и один разбор HTML на все данные."""
+
+    def __init__(self, html, etag=None, last_modified=None, content_hash=None):
+        with metrics.timed('html_parse'):
+            page = get_parser(HTML_PARSER)(html)
+        self.fetched_at = datetime.now()
+        self.etag = etag
+        self.last_modified = last_modified
+        self.content_hash = content_hash
+        self.replacements = parse_replacements_table(page.rows)
+        self.date, self.day = parse_date_header(page.headers)
+        self.week_type = parse_week_type_header(page.headers)
+
+    @staticmethod
+    def request_headers(previous=None):
+        """Заголовки условного запроса по прошлому снимку."""
+        headers = {}
+        if previous:
+            if previous.etag:
+                headers['If-None-Match'] = previous.etag
+            if previous.last_modified:
+                headers['If-Modified-Since'] = previous.last_modified
+        return headers
 
-def parse_website_date():
-    """Парсит дату и день недели с сайта."""
+    @classmethod
+    def from_response(cls, status, headers, content, previous=None):
+        """Строит снимок по ответу сервера.
+
+        Если страница не изменилась с прошлого снимка (ответ 304 или
+        совпадает хэш содержимого), повторный разбор не выполняется.
+        """
+        if previous and status == 304:
+            return previous.renewed()
+
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        content_hash = hashlib.sha1(content).hexdigest()
+        if previous and previous.content_hash == content_hash:
+            return previous.renewed(etag, last_modified)
+
+        return cls(content.decode('utf-8', errors='replace'), etag, last_modified, content_hash)
+
+    @classmethod
+    def fetch(cls, previous=None):
+        """Скачивает страницу замен и разбирает её."""
+        with metrics.timed('site_fetch'):
+            response = SESSION.get(URL, timeout=15, headers=cls.request_headers(previous))
+            response.raise_for_status()
+        metrics.inc(f'site_status_{response.status_code}')
+        return cls.from_response(response.status_code, response.headers, response.content, previous)
+
+    def renewed(self, etag=None, last_modified=None):
+        """Копия снимка с новым временем проверки для неизменившейся страницы."""
+        snapshot = copy.copy(self)
+        snapshot.fetched_at = datetime.now()
+        snapshot.etag = etag or self.etag
+        snapshot.last_modified = last_modified or self.last_modified
+        return snapshot
+
+def get_page_snapshot(previous=None):
+    """Возвращает свежий снимок страницы или None при ошибке."""
     try:
-        response = SESSION.get(URL, timeout=15)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        date_div = soup.find('div', align='center', string=lambda x: x and 'расписании на' in x.lower())
-        if date_div:
-            try:
-                part = date_div.text.split("на", 1)[1].strip()
-                date_str, day_str = part.split("/", 1)
-                date = datetime.strptime(date_str.strip(), "%d %B %Y года")
-                cache['date'] = date
-                cache['last_update'] = datetime.now()
-                return date, day_str.strip().lower()
-            except Exception as inner_e:
-                print(f"Ошибка парсинга строки даты: {inner_e}")
-        return cache['date'] or datetime.now(), None
+        return PageSnapshot.fetch(previous)
     except Exception as e:
-        print(f"Ошибка парсинга даты: {e}")
-        return cache['date'] or datetime.now(), None
+        print(f"Ошибка загрузки страницы замен: {e}")
+        return None
+
+def store_snapshot(snapshot):
+    """Делает снимок текущим для всех обработчиков."""
+    with cache_lock:
+        cache['snapshot'] = snapshot
+        fetch_replacements(snapshot)
+        parse_website_date(snapshot)
+        get_week_type(snapshot)
+
+def refresh_snapshot(timeout=None):
+    """Скачивает страницу и обновляет кэш. При ошибке возвращает прошлый снимок.
 
-def fetch_replacements():
-    """Получает замены с сайта."""
+    Одновременные вызовы не повторяют запрос: кто пришёл во время загрузки,
+    ждёт её окончания (не дольше timeout секунд, если он задан) и получает
+    тот же результат.
+    """
+    generation = refresh_state['generation']
+    if not fetch_lock.acquire(timeout=-1 if timeout is None else timeout):
+        return cache['snapshot']  # Загрузка идёт дольше timeout
     try:
-        response = SESSION.get(URL, timeout=15)
-        response.encoding = 'utf-8'
-        soup = BeautifulSoup(response.text, 'html.parser')
-        replacements = {}
-        
-        table = soup.find('table')
-        if not table:
-            return cache['replacements'] or {}
-            
-        for row in table.find_all('tr')[1:]:
-            cells = row.find_all('td')
-            if len(cells) < 6 or GROUP_NAME not in cells[1].text:
-                continue
-                
-            pair_numbers = cells[2].text.strip()
-            discipline = cells[4].text.strip()
-            classroom = cells[5].text.strip()
-            
-            pairs = []
-            for part in pair_numbers.split(','):
-                part = part.strip()
-                if '-' in part:
-                    start, end = map(int, part.split('-'))
-                    pairs.extend(map(str, range(start, end+1)))
-                else:
-                    pairs.append(part)
-            
+        previous = cache['snapshot']
+        if refresh_state['generation'] != generation:
+            return previous  # Пока ждали, страницу уже загрузили
+        snapshot = get_page_snapshot(previous)
+        if snapshot:
+            store_snapshot(snapshot)
+        else:
+            refresh_state['next_try'] = time.monotonic() + REFRESH_RETRY_DELAY
+        refresh_state['generation'] += 1
+    finally:
+        fetch_lock.release()
+    if not snapshot:
+        return previous
+    after_refresh(previous, snapshot)
+    return snapshot
+
+def background_refresh():
+    """Обновляет снимок в отдельном потоке, если обновление ещё не идёт."""
+    with cache_lock:
+        if refresh_state['background'] or time.monotonic() < refresh_state['next_try']:
+            return
+        refresh_state['background'] = True
+
+    def run():
+        try:
+            refresh_snapshot()
+        finally:
+            refresh_state['background'] = False
+
+    threading.Thread(target=run, daemon=True).start()
+
+def is_snapshot_fresh(snapshot, max_age=CACHE_MAX_AGE):
+    """Проверяет, что снимок не старше max_age секунд."""
+    return bool(snapshot) and (datetime.now() - snapshot.fetched_at).total_seconds() <= max_age
+
+def get_cached_snapshot(max_age=CACHE_MAX_AGE):
+    """Возвращает снимок из кэша.
+
+    Устаревший снимок отдаётся сразу, а обновление запускается в фоне.
+    Ждать загрузки приходится, только если снимка ещё нет: одновременные
+    запросы ждут одну загрузку, но не дольше SNAPSHOT_WAIT_TIMEOUT. Если
+    загрузка недавно не удалась, сразу возвращается None (расписание без
+    замен): повторит её фоновый поток, а не каждый обработчик, иначе при
+    упавшем сайте все потоки ждут его по минуте.
+    """
+    snapshot = cache['snapshot']
+    if is_snapshot_fresh(snapshot, max_age):
+        return snapshot
+    if snapshot is None:
+        if time.monotonic() < refresh_state['next_try']:
+            return None
+        return refresh_snapshot(SNAPSHOT_WAIT_TIMEOUT)
+    background_refresh()
+    return snapshot
+
+def parse_pair_numbers(pair_numbers):
+    """Разбирает номера пар вида "2", "2-3" или "2,4"."""
+    pairs = []
+    for part in pair_numbers.split(','):
+        part = part.strip()
+        if '-' in part:
+            start, end = map(int, part.split('-'))
+            pairs.extend(map(str, range(start, end+1)))
+        else:
+            pairs.append(part)
+    return pairs
+
+def parse_groups(text):
+    """Извлекает названия групп из ячейки таблицы замен."""
+    text = normalize_group(text)
+    return GROUP_PATTERN.findall(text) or ([text] if text else [])
+
+@metrics.timed_function('parse_replacements_table')
+def parse_replacements_table(rows):
+    """Строит индекс замен группа -> пара -> замена по строкам таблицы. None, если таблицы нет."""
+    if rows is None:
+        return None
+
+    replacements = {}
+    for cells in rows[1:]:
+        if len(cells) < 6:
+            continue
+        groups = parse_groups(cells[1])
+        if not groups:
+            continue
+
+        try:
+            pairs = parse_pair_numbers(cells[2].strip())
+        except ValueError as e:
+            print(f"Ошибка разбора номеров пар: {e}")
+            continue
+        discipline = cells[4].strip()
+        classroom = cells[5].strip()
+
+        replacement = make_lesson(discipline, cab=classroom)
+        for group in groups:
+            group_replacements = replacements.setdefault(group, {})
             for pair in pairs:
-                replacements[pair] = {'name': discipline, 'cab': classroom}
-        
-        cache['replacements'] = replacements
-        cache['last_update'] = datetime.now()
-        return replacements
-    except Exception as e:
-        print(f"Ошибка получения замен: {e}")
-        return cache['replacements'] or {}
+                group_replacements[pair] = replacement
+    return replacements
+
+@metrics.timed_function('parse_date_header')
+def parse_date_header(headers):
+    """Извлекает дату и день недели из заголовков страницы."""
+    date_text = next((text for text in headers if 'расписании на' in text.lower()), None)
+    if date_text:
+        try:
+            part = date_text.split("на", 1)[1].strip()
+            date_str, day_str = part.split("/", 1)
+            date = datetime.strptime(date_str.strip(), "%d %B %Y года")
+            return date, day_str.strip().lower()
+        except Exception as e:
+            print(f"Ошибка парсинга строки даты: {e}")
+    return None, None
+
+@metrics.timed_function('parse_week_type_header')
+def parse_week_type_header(headers):
+    """Определяет тип недели по заголовкам страницы."""
+    for text in headers:
+        text = text.lower()
+        if "числитель" in text:
+            return "числитель"
+        elif "знаменатель" in text:
+            return "знаменатель"
+    return "числитель"
+
+def parse_website_date(snapshot=None):
+    """Дата и день недели со страницы. Без снимка — последние известные."""
+    if snapshot and snapshot.date:
+        cache['date'] = snapshot.date
+        cache['last_update'] = snapshot.fetched_at
+        return snapshot.date, snapshot.day
+    return cache['date'] or datetime.now(), None
 
-def get_merged_replacements():
+def fetch_replacements(snapshot=None, group=GROUP_NAME):
+    """Замены группы со страницы. Без снимка — последние известные."""
+    if snapshot and snapshot.replacements is not None:
+        cache['replacements'] = snapshot.replacements
+        cache['last_update'] = snapshot.fetched_at
+    return (cache['replacements'] or {}).get(normalize_group(group), {})
+
+def get_merged_replacements(snapshot=None, group=GROUP_NAME):
     """Объединяет замены с сайта и пользовательские."""
-    site_replacements = fetch_replacements()
-    custom_replacements = load_custom_replacements()
+    site_replacements = fetch_replacements(snapshot, group)
+    custom_replacements = load_custom_replacements(group)
     return {**site_replacements, **custom_replacements}
 
-def get_week_type():
+def get_week_type(snapshot=None):
     """Определяет тип недели (числитель/знаменатель)."""
-    try:
-        response = SESSION.get(URL, timeout=10)
-        response.encoding = 'utf-8'
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        divs = soup.find_all('div', align='center')
-        week_type = None
-        for div in divs:
-            text = div.get_text().lower()
-            if "числитель" in text:
-                week_type = "числитель"
-                break
-            elif "знаменатель" in text:
-                week_type = "знаменатель"
-                break
-                
-        if not week_type:
-            week_type = "числитель"
-        cache['week_type'] = week_type
-        return week_type
-    except Exception as e:
-        print(f"Ошибка определения типа недели: {e}")
+    if snapshot:
+        week_type = snapshot.week_type
+    else:
         current_week = (cache['date'] or datetime.now()).isocalendar()[1]
         week_type = "числитель" if current_week % 2 else "знаменатель"
-        cache['week_type'] = week_type
-        return week_type
+    cache['week_type'] = week_type
+    return week_type
 
+@metrics.timed_function('format_schedule')
 def format_schedule(day_schedule, replacements):
-    """Форматирует расписание с учетом замен."""
+    """Форматирует расписание с учетом замен (значения — Lesson). Пары должны идти по порядку."""
     output = []
     
     # Обработка 2 пары только при наличии данных
-    lesson_2 = day_schedule.get('2', {})
-    replacement_2 = replacements.get('2', {})
+    lesson_2 = day_schedule.get('2', EMPTY_LESSON)
+    replacement_2 = replacements.get('2')
     
     # Проверяем, есть ли реальные данные для отображения
-    has_original = any(lesson_2.values())  # Проверка name/teacher/cab
-    has_replacement = any(replacement_2.values())
+    has_original = lesson_2.has_data()
+    has_replacement = replacement_2 is not None and replacement_2.has_data()
     
     if has_replacement or has_original:
-        if replacement_2:
+        if replacement_2 is not None:
             output.append(
                 "⚠️ *ЗАМЕНА ДЛЯ 2 ПАРЫ:*\n"
-                f"🔄 *{replacement_2.get('name', '')}* \n"
-                f"Кабинет: {replacement_2.get('cab', '')}\n"
+                f"🔄 *{replacement_2.name}* \n"
+                f"Кабинет: {replacement_2.cab}\n"
                 "―――――――――――――――――――"
             )
         else:
             output.append(
-                f"📘 Пара 2: *{lesson_2.get('name', '')}*\n"
-                f"Преподаватель: {lesson_2.get('teacher', '')}\n"
-                f"Кабинет: {lesson_2.get('cab', '')}\n"
+                f"📘 Пара 2: *{lesson_2.name}*\n"
+                f"Преподаватель: {lesson_2.teacher}\n"
+                f"Кабинет: {lesson_2.cab}\n"
                 "―――――――――――――――――――"
             )
     
     # Обработка остальных пар
-    for pair_num in sorted(day_schedule.keys(), key=lambda x: int(x)):
+    for pair_num, lesson in day_schedule.items():
         if pair_num == '2':  # Уже обработали
             continue
             
-        lesson = day_schedule[pair_num]
-        replacement = replacements.get(pair_num, {})
+        replacement = replacements.get(pair_num)
         
-        if replacement:
+        if replacement is not None:
             output.append(
-                f"🔄 Пара {pair_num}: *{replacement.get('name', '')}*\n"
-                f"Кабинет: {replacement.get('cab', '')}\n"
+                f"🔄 Пара {pair_num}: *{replacement.name}*\n"
+                f"Кабинет: {replacement.cab}\n"
                 "―――――――――――――――――――"
             )
         else:
             output.append(
-                f"📘 Пара {pair_num}: *{lesson.get('name', '')}*\n"
-                f"Преподаватель: {lesson.get('teacher', '')}\n"
-                f"Кабинет: {lesson.get('cab', '')}\n"
+                f"📘 Пара {pair_num}: *{lesson.name}*\n"
+                f"Преподаватель: {lesson.teacher}\n"
+                f"Кабинет: {lesson.cab}\n"
                 "―――――――――――――――――――"
             )
     
     return "\n".join(output) if output else "Занятий нет"
 
-def get_schedule(day_offset=0):
-    """Формирует расписание на указанный день."""
-    cache['replacements'] = None
-    cache['date'] = None
+def render_schedule(schedule, target_day, week_type, replacements):
+    """Собирает текст расписания на день."""
+    if target_day not in schedule:
+        return "Расписание не найдено"
+    day_schedule = schedule[target_day].get(week_type, {})
+    schedule_text = format_schedule(day_schedule, replacements)
+    return f"*{target_day}, неделя: {week_type.capitalize()}*\n\n{schedule_text}"
+
+def get_rendered_schedule(key, version, render):
+    """Возвращает готовый текст из кэша или рендерит и запоминает его.
+
+    Кэш сбрасывается целиком, как только меняется версия данных.
+    """
+    with cache_lock:
+        if rendered_cache['version'] != version:
+            rendered_cache['version'] = version
+            rendered_cache['messages'] = {}
+        messages = rendered_cache['messages']
+    text = messages.get(key)
+    if text is None:
+        text = render()
+        messages[key] = text
+    return text
+
+def get_schedule(day_offset=0, force_refresh=False, group=GROUP_NAME, fetch=True):
+    """Формирует расписание группы на указанный день.
+
+    При fetch=False сайт не запрашивается: используется только то, что уже
+    лежит в кэше (так работает асинхронный запуск, который обновляет кэш сам).
+    """
     try:
-        schedule = load_schedule()
-        replacements = get_merged_replacements()
+        if force_refresh:
+            snapshot = refresh_snapshot()
+        elif fetch:
+            snapshot = get_cached_snapshot()
+        else:
+            snapshot = cache['snapshot']
         
-        base_date, website_day = parse_website_date()
+        base_date, website_day = parse_website_date(snapshot)
         if day_offset == 0:
             if website_day:
                 target_day = website_day.capitalize()
@@ -254,94 +791,267 @@ def get_schedule(day_offset=0):
             days = ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница", "Суббота", "Воскресенье"]
             target_day = days[target_date.weekday()]
         
-        week_type = get_week_type()
-        
-        for entry in schedule:
-            if target_day in entry:
-                day_schedule = entry[target_day].get(week_type, {})
-                schedule_text = format_schedule(day_schedule, replacements)
-                return f"*{target_day}, неделя: {week_type.capitalize()}*\n\n{schedule_text}"
-        
-        return "Расписание не найдено"
+        week_type = get_week_type(snapshot)
+        schedule = load_schedule(group)
+
+        def render():
+            replacements = get_merged_replacements(snapshot, group)
+            return render_schedule(schedule, target_day, week_type, replacements)
+
+        if snapshot is None:
+            return render()
+
+        version = (
+            snapshot.content_hash,
+            cache['custom_version'],
+            datetime.now().date(),
+            timetable['source']
+        )
+        key = (normalize_group(group), target_day, week_type)
+        return get_rendered_schedule(key, version, render)
     except Exception as e:
         print(f"Ошибка формирования расписания: {e}")
         return "Ошибка получения расписания"
 
+def format_update_status():
+    """Строка о времени последнего обновления данных."""
+    return f"\n\n🔄 Данные обновлены: {cache['last_update'].strftime('%H:%M:%S') if cache['last_update'] else 'недоступны'}"
+
 # -------------------------------
 # Обработчики команд бота
 # -------------------------------
 
+def welcome_markup():
+    """Клавиатура с кнопками выбора дня."""
+    markup = ReplyKeyboardMarkup(resize_keyboard=True)
+    markup.add(KeyboardButton("Сегодня"), KeyboardButton("Завтра"))
+    return markup
+
+def group_command_reply(chat_id, text):
+    """Выполняет команду /group и возвращает ответ (Markdown)."""
+    parts = text.split(maxsplit=1)
+    if len(parts) < 2:
+        group = users.get_group(chat_id, GROUP_NAME)
+        return f"Ваша группа: {group}\nЧтобы сменить, отправьте `/group ИБ1-41`"
+
+    group = normalize_group(parts[1])
+    if not GROUP_PATTERN.fullmatch(group):
+        return "❌ Не похоже на название группы. Пример: `/group ИБ1-41`"
+
+    users.set_group(chat_id, group)
+    return f"✅ Группа {group} сохранена"
+
+def refresh_reply(snapshot):
+    """Ответ администратору после принудительного обновления."""
+    if snapshot:
+        return f"✅ Данные обновлены: {snapshot.fetched_at.strftime('%H:%M:%S')}"
+    return "⚠️ Сервер с расписанием временно недоступен."
+
+def replacement_input_reply(text, group=GROUP_NAME):
+    """Сохраняет замену, введённую в формате "3 Математика 207", и возвращает ответ.
+
+    Замена записывается группе group (группе администратора), если первым
+    словом не указана другая: "ИС1-31 3 Математика 207".
+    """
+    try:
+        parts = text.split()
+        if GROUP_PATTERN.fullmatch(normalize_group(parts[0])):
+            group = normalize_group(parts.pop(0))
+        pair_num = parts[0]
+        subject = ' '.join(parts[1:-1])
+        classroom = parts[-1]
+        
+        save_custom_replacement(pair_num, {'name': subject, 'cab': classroom}, group)
+        return f"✅ Замена для группы {group}, пара {pair_num} сохранена!"
+    except Exception as e:
+        return f"❌ Ошибка: {str(e)}"
+
+def stats_reply():
+    """Сводка метрик для администратора: время этапов, очереди, лимиты."""
+    lines = ["📊 Этапы (вызовов, p50 / p99 мс, ошибок):"]
+    for name, count, p50, p99, errors in metrics.summary():
+        lines.append(f"{name}: {count}, {p50 * 1000:.1f} / {p99 * 1000:.1f}, {errors}")
+    lines.append("")
+    lines.extend(f"{name}: {value}" for name, value in sorted(runtime_stats().items()))
+    return "\n".join(lines)
+
+def rate_limit_notice(user_id):
+    """Проверяет лимит запросов.
+
+    Возвращает (разрешено, текст предупреждения или None).
+    """
+    verdict, wait, warn = rate_limiter.check(user_id)
+    if verdict == 'user':
+        return False, f"⏳ Подождите {int(wait) + 1} сек. перед следующим запросом" if warn else None
+    if verdict == 'global':
+        return False, None  # Бот перегружен: запрос отбрасывается без ответа
+    return True, None
+
 @bot.message_handler(commands=['start'])
 def send_welcome(message):
     """Обработчик команды /start."""
-    markup = ReplyKeyboardMarkup(resize_keyboard=True)
-    markup.add(KeyboardButton("Сегодня"), KeyboardButton("Завтра"))
-    bot.send_message(
+    send_queue.send(
         message.chat.id,
-        "📅 *Расписание занятий*\nВыберите день:",
+        WELCOME_TEXT,
         parse_mode="Markdown",
-        reply_markup=markup
+        reply_markup=welcome_markup()
     )
 
+@bot.message_handler(commands=['group'])
+def handle_group(message):
+    """Обработчик команды выбора группы."""
+    send_queue.send(message.chat.id, group_command_reply(message.chat.id, message.text), parse_mode="Markdown")
+
 @bot.message_handler(commands=['add_replacement'])
 def handle_add_replacement(message):
     """Обработчик команды добавления замены."""
     if message.from_user.id not in ADMINS:
         return
     
-    msg = bot.send_message(message.chat.id, "Введите номер пары и замену в формате:\n`3 Математика 207`", parse_mode="Markdown")
+    msg = bot.send_message(message.chat.id, REPLACEMENT_PROMPT, parse_mode="Markdown")
     bot.register_next_step_handler(msg, process_replacement)
 
+@bot.message_handler(commands=['refresh'])
+def handle_refresh(message):
+    """Обработчик команды принудительного обновления данных."""
+    if message.from_user.id not in ADMINS:
+        return
+
+    send_queue.send(message.chat.id, refresh_reply(refresh_snapshot()))
+
+@bot.message_handler(commands=['stats'])
+def handle_stats(message):
+    """Обработчик команды просмотра метрик."""
+    if message.from_user.id not in ADMINS:
+        return
+
+    send_queue.send(message.chat.id, stats_reply())
+
 def process_replacement(message):
     """Обрабатывает ввод замены."""
-    try:
-        parts = message.text.split()
-        pair_num = parts[0]
-        subject = ' '.join(parts[1:-1])
-        classroom = parts[-1]
-        
-        save_custom_replacement(pair_num, {'name': subject, 'cab': classroom})
-        bot.send_message(message.chat.id, f"✅ Замена для пары {pair_num} сохранена!")
-    except Exception as e:
-        bot.send_message(message.chat.id, f"❌ Ошибка: {str(e)}")
+    group = users.get_group(message.chat.id, GROUP_NAME)
+    send_queue.send(message.chat.id, replacement_input_reply(message.text, group))
 
 @bot.message_handler(func=lambda m: True)
 def handle_message(message):
     """Обработчик текстовых сообщений."""
-    user_id = message.from_user.id
-    now = time.time()
-    
-    if user_id in last_request_time and (now - last_request_time[user_id]) < 5:
-        bot.send_message(message.chat.id, "⏳ Подождите 5 секунд перед следующим запросом")
+    allowed, notice = rate_limit_notice(message.from_user.id)
+    if not allowed:
+        if notice:
+            send_queue.send(message.chat.id, notice)
         return
     
-    last_request_time[user_id] = now
-    
+    group = users.get_group(message.chat.id, GROUP_NAME)
     try:
-        if message.text.lower() == "сегодня":
-            schedule_text = get_schedule(0)
-            status = f"\n\n🔄 Данные обновлены: {cache['last_update'].strftime('%H:%M:%S') if cache['last_update'] else 'недоступны'}"
-            bot.send_message(message.chat.id, schedule_text + status, parse_mode="Markdown")
-        elif message.text.lower() == "завтра":
-            schedule_text = get_schedule(1)
-            status = f"\n\n🔄 Данные обновлены: {cache['last_update'].strftime('%H:%M:%S') if cache['last_update'] else 'недоступны'}"
-            bot.send_message(message.chat.id, schedule_text + status, parse_mode="Markdown")
+        day_offset = DAY_BUTTONS.get(message.text.lower())
+        if day_offset is None:
+            send_queue.send(message.chat.id, UNKNOWN_INPUT_TEXT)
         else:
-            bot.send_message(message.chat.id, "ℹ️ Используйте кнопки для выбора")
+            schedule_text = get_schedule(day_offset, group=group)
+            send_queue.send(message.chat.id, schedule_text + format_update_status(), parse_mode="Markdown")
     except Exception as e:
-        bot.send_message(message.chat.id, "⚠️ Сервер с расписанием временно недоступен. Попробуйте позже.")
+        send_queue.send(message.chat.id, SITE_UNAVAILABLE_TEXT)
+
+# -------------------------------
+# Уведомления об изменениях замен
+# -------------------------------
+
+def diff_replacements(previous, snapshot):
+    """Сравнивает замены двух снимков по группам.
+
+    Возвращает группа -> {пара: новая замена или None, если замену убрали}.
+    Для первого снимка после запуска изменений нет, а страница на другую
+    дату считается целиком новой.
+    """
+    if previous is None or snapshot is None or snapshot.replacements is None:
+        return {}
+    if previous.content_hash == snapshot.content_hash:
+        return {}
+    old = previous.replacements or {}
+    if previous.date != snapshot.date:
+        old = {}
+
+    changes = {}
+    for group in old.keys() | snapshot.replacements.keys():
+        old_pairs = old.get(group, {})
+        new_pairs = snapshot.replacements.get(group, {})
+        # Одинаковые замены — один и тот же объект Lesson (см. lessons.py)
+        changed = {
+            pair: new_pairs.get(pair)
+            for pair in old_pairs.keys() | new_pairs.keys()
+            if old_pairs.get(pair) is not new_pairs.get(pair)
+        }
+        if changed:
+            changes[group] = dict(sorted(changed.items(), key=lambda item: int(item[0]) if item[0].isdigit() else 0))
+    return changes
+
+def format_replacement_notice(group, day, changed):
+    """Текст уведомления об изменившихся парах группы (Markdown)."""
+    title = f"🔔 *Изменения в заменах для {group}*"
+    if day:
+        title += f"\n{day.capitalize()}"
+    output = [title]
+    for pair, replacement in changed.items():
+        if replacement is None:
+            output.append(f"❌ Пара {pair}: замена отменена")
+        else:
+            output.append(
+                f"🔄 Пара {pair}: *{replacement.name}*\n"
+                f"Кабинет: {replacement.cab}"
+            )
+    return "\n\n".join(output)
+
+def replacement_notices(previous, snapshot):
+    """Список (chat_id, текст) для подписчиков групп с изменившимися заменами.
+
+    Каждый чат получает одно сообщение со всеми изменениями своей группы.
+    """
+    notices = []
+    for group, changed in diff_replacements(previous, snapshot).items():
+        chats = users.chats_in_group(group)
+        if not chats:
+            continue
+        text = format_replacement_notice(group, snapshot.day, changed)
+        notices.extend((chat_id, text) for chat_id in sorted(chats))
+    return notices
+
+def broadcast(notices):
+    """Ставит уведомления в очередь отправки после ответов пользователям."""
+    for chat_id, text in notices:
+        send_queue.send(chat_id, text, PRIORITY_BROADCAST, parse_mode="Markdown")
+
+def notify_changes(previous, snapshot):
+    """Рассылает изменения замен между снимками подписчикам групп."""
+    notices = replacement_notices(previous, snapshot)
+    if notices:
+        print(f"Рассылка изменений замен: {len(notices)} сообщений")
+        broadcast(notices)
+
+def after_refresh(previous, snapshot):
+    """Учитывает новый снимок: статистика изменений страницы и уведомления."""
+    if previous is not None and previous.content_hash != snapshot.content_hash:
+        refresh_scheduler.record_change(snapshot.fetched_at)
+    notify_changes(previous, snapshot)
 
 # -------------------------------
 # Фоновые задачи
 # -------------------------------
 
 def background_updater():
-    """Фоновая задача для обновления данных."""
+    """Фоновая задача для обновления данных (изменения рассылает refresh_snapshot)."""
     while True:
         print("Обновление данных...")
-        fetch_replacements()
-        parse_website_date()
-        time.sleep(300)  # Каждые 5 минут
+        refresh_snapshot()
+        time.sleep(refresh_scheduler.next_delay(datetime.now()))
+
+def users_flusher():
+    """Фоновая задача записи настроек пользователей на диск."""
+    while True:
+        time.sleep(USERS_FLUSH_INTERVAL)
+        try:
+            users.flush()
+        except Exception as e:
+            print(f"Ошибка сохранения пользователей: {e}")
 
 # -------------------------------
 # Запуск бота
@@ -349,13 +1059,24 @@ def background_updater():
 
 if __name__ == '__main__':
     print("Бот запущен...")
+    load_schedule()
     updater_thread = threading.Thread(target=background_updater)
     updater_thread.daemon = True
     updater_thread.start()
-    
-    while True:
-        try:
-            bot.polling(none_stop=True, interval=1, timeout=60)
-        except Exception as e:
-            print(f"Ошибка подключения: {e}")
-            time.sleep(30)
\ No newline at end of file
+    threading.Thread(target=users_flusher, daemon=True).start()
+    send_queue.start()
+    if METRICS_LISTEN:
+        metrics.start_server(METRICS_LISTEN)
+    atexit.register(users.flush)
+
+    if WEBHOOK_URL:
+        run_webhook(bot, dispatcher, WEBHOOK_URL, WEBHOOK_LISTEN, WEBHOOK_SECRET)
+    else:
+        while True:
+            try:
+                # После работы через webhook getUpdates отвечает 409, пока webhook не снят
+                bot.remove_webhook()
+                bot.polling(none_stop=True, interval=1, timeout=60)
+            except Exception as e:
+                print(f"Ошибка подключения: {e}")
+                time.sleep(30)
\ No newline at end of file
@@ -0,0 +1,19 @@
+"""Общие настройки тестов: запуск из корня репозитория, python -m pytest."""
+import os
+import sys
+import locale
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Бот создаётся при импорте telbot, и TeleBot проверяет формат токена
+os.environ.setdefault('TELBOT_TOKEN', '123456:TEST')
+
+@pytest.fixture(scope='session')
+def telbot():
+    """Модуль бота (нужна локаль ru_RU.UTF-8, как и самому боту)."""
+    try:
+        import telbot
+    except locale.Error:
+        pytest.skip("нет локали ru_RU.UTF-8")
+    return telbot
@@ -0,0 +1,29 @@
+from types import SimpleNamespace
+
+from lessons import make_lesson
+
+MATH = make_lesson('Математика', '', '207')
+PHYSICS = make_lesson('Физика', '', '101')
+
+def snapshot(replacements, content_hash='a', date='19.10.2026'):
+    return SimpleNamespace(replacements=replacements, content_hash=content_hash, date=date)
+
+def test_no_changes_for_first_or_same_snapshot(telbot):
+    page = snapshot({'ИБ1-41': {'2': MATH}})
+    assert telbot.diff_replacements(None, page) == {}
+    assert telbot.diff_replacements(page, snapshot({'ИБ1-41': {'3': PHYSICS}})) == {}  # Тот же хеш страницы
+    assert telbot.diff_replacements(page, snapshot(None, 'b')) == {}  # Таблицы нет
+
+def test_changed_added_and_removed_pairs(telbot):
+    previous = snapshot({'ИБ1-41': {'2': MATH, '3': PHYSICS}, 'ИС1-31': {'1': MATH}})
+    current = snapshot({'ИБ1-41': {'2': make_lesson('Математика', '', '207'), '3': MATH, '10': PHYSICS}}, 'b')
+    assert telbot.diff_replacements(previous, current) == {
+        'ИБ1-41': {'3': MATH, '10': PHYSICS},
+        'ИС1-31': {'1': None}
+    }
+    assert list(telbot.diff_replacements(previous, current)['ИБ1-41']) == ['3', '10']
+
+def test_page_for_another_date_is_all_new(telbot):
+    previous = snapshot({'ИБ1-41': {'2': MATH}})
+    current = snapshot({'ИБ1-41': {'2': MATH}}, 'b', '20.10.2026')
+    assert telbot.diff_replacements(previous, current) == {'ИБ1-41': {'2': MATH}}
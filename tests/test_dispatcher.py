@@ -0,0 +1,91 @@
+import random
+import threading
+import time
+
+import telebot
+from telebot.types import Update
+
+from dispatcher import ChatDispatcher
+
+def make_update(update_id, chat_id):
+    return Update.de_json({
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id, 'date': 0, 'text': str(update_id),
+            'chat': {'id': chat_id, 'type': 'private'}
+        }
+    })
+
+def wait_idle(dispatcher, timeout=10):
+    deadline = time.monotonic() + timeout
+    while dispatcher.pending() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not dispatcher.pending()
+
+def test_updates_of_one_chat_keep_order():
+    rng = random.Random(1)
+    delays = [rng.uniform(0, 0.005) for _ in range(200)]
+    lock = threading.Lock()
+    seen = {}  # chat_id -> update_id по порядку обработки
+    active = set()
+    overlaps = []
+
+    def process(updates):
+        update = updates[0]
+        chat_id = update.message.chat.id
+        with lock:
+            if chat_id in active:
+                overlaps.append(chat_id)
+            active.add(chat_id)
+        time.sleep(delays[update.update_id])
+        with lock:
+            active.discard(chat_id)
+            seen.setdefault(chat_id, []).append(update.update_id)
+
+    dispatcher = ChatDispatcher(process, workers=8, max_pending=200)
+    updates = [make_update(number, number % 5) for number in range(200)]
+    dispatcher.process_new_updates(updates)
+    wait_idle(dispatcher)
+
+    assert not overlaps
+    for chat_id, ids in seen.items():
+        assert ids == [number for number in range(200) if number % 5 == chat_id]
+    assert dispatcher.stats['processed'] == 200
+
+def test_submit_rejects_when_full():
+    release = threading.Event()
+    dispatcher = ChatDispatcher(lambda updates: release.wait(), workers=2, max_pending=3)
+    assert all(dispatcher.submit(make_update(number, number)) for number in range(3))
+    assert not dispatcher.submit(make_update(3, 3))
+    assert dispatcher.stats['rejected'] == 1
+    release.set()
+    wait_idle(dispatcher)
+    assert dispatcher.stats['processed'] == 3
+
+def test_long_polling_does_not_fetch_queued_updates_again():
+    bot = telebot.TeleBot('123456:TEST', threaded=False)
+    lock = threading.Lock()
+    handled = []
+
+    @bot.message_handler(func=lambda message: True)
+    def handle(message):
+        time.sleep(0.05)  # Медленный обработчик: обновления ждут свободного потока
+        with lock:
+            handled.append(message.message_id)
+
+    updates = [make_update(number, number % 4) for number in range(1, 7)]
+    bot.get_updates = lambda offset=None, **kwargs: [update for update in updates if update.update_id >= offset]
+
+    def ack(update_id):
+        bot.last_update_id = max(bot.last_update_id, update_id)
+
+    dispatcher = ChatDispatcher(bot.process_new_updates, workers=2, max_pending=100, ack=ack)
+    bot.process_new_updates = dispatcher.process_new_updates
+    for _ in range(10):
+        # Как TeleBot.__retrieve_updates при long polling
+        bot.process_new_updates(bot.get_updates(offset=bot.last_update_id + 1))
+        time.sleep(0.02)
+    wait_idle(dispatcher)
+
+    assert sorted(handled) == [1, 2, 3, 4, 5, 6]
+    assert bot.last_update_id == 6
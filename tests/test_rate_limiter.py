@@ -0,0 +1,43 @@
+import time
+
+import pytest
+
+class Clock:
+    """Подменяет time.monotonic: время двигается только вручную."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, 'monotonic', clock)
+    return clock
+
+def test_buckets_never_exceed_max_users(telbot, clock):
+    limiter = telbot.RateLimiter(user_rate=0.2, user_burst=2, global_rate=1000, global_burst=1000, max_users=3)
+    for user_id in range(10):
+        assert limiter.check(user_id)[0] == 'ok'
+        assert len(limiter.buckets) <= 3
+    assert list(limiter.buckets) == [7, 8, 9]  # Вытесняются самые давние
+    assert limiter.get_stats()['evicted'] == 7
+
+def test_idle_buckets_are_evicted(telbot, clock):
+    limiter = telbot.RateLimiter(user_rate=0.2, user_burst=2, global_rate=1000, global_burst=1000, max_users=100)
+    limiter.check(1)
+    clock.now += 5
+    limiter.check(2)
+    clock.now += limiter.idle_ttl - 1  # Корзина 1 простояла дольше idle_ttl, корзина 2 — нет
+    limiter.check(3)
+    assert list(limiter.buckets) == [2, 3]
+
+def test_user_limit_warns_once(telbot, clock):
+    limiter = telbot.RateLimiter(user_rate=0.2, user_burst=2, global_rate=1000, global_burst=1000, max_users=100)
+    assert [limiter.check(1)[0] for _ in range(2)] == ['ok', 'ok']
+    assert limiter.check(1) == ('user', 5.0, True)
+    assert limiter.check(1)[2] is False
+    clock.now += 5
+    assert limiter.check(1)[0] == 'ok'
@@ -0,0 +1,68 @@
+import time
+
+from telebot.apihelper import ApiTelegramException
+
+from send_queue import SendQueue, PRIORITY_REPLY, PRIORITY_BROADCAST
+
+def too_many_requests(retry_after):
+    return ApiTelegramException('sendMessage', None, {
+        'ok': False, 'error_code': 429, 'description': 'Too Many Requests',
+        'parameters': {'retry_after': retry_after}
+    })
+
+class Sender:
+    """Заглушка bot.send_message: отвечает ошибками из errors по очереди."""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.sent = []
+
+    def __call__(self, chat_id, text, **kwargs):
+        if self.errors:
+            error = self.errors.pop(0)
+            if error:
+                raise error
+        self.sent.append((chat_id, text))
+
+def take(queue, now=None):
+    item, priority = queue._take(time.monotonic() if now is None else now)
+    assert item is not None
+    return item, priority
+
+def test_429_requeues_at_head_of_lane():
+    sender = Sender(too_many_requests(5))
+    queue = SendQueue(sender, rate=100, burst=100, chat_interval=0)
+    queue.send(1, 'первое', PRIORITY_BROADCAST)
+    queue.send(2, 'второе', PRIORITY_BROADCAST)
+
+    item, priority = take(queue)
+    queue._deliver(item, priority)
+
+    assert [entry[1] for entry in queue.lanes[PRIORITY_BROADCAST]] == ['первое', 'второе']
+    assert item[3] == 0  # 429 не считается попыткой
+    assert queue.stats['retried'] == 1
+    item, wait = queue._take(queue.paused_until - 1)
+    assert item is None and wait > 0.5  # Отправка приостановлена на retry_after
+
+    for _ in range(2):
+        queue._deliver(*take(queue, queue.paused_until))
+    assert sender.sent == [(1, 'первое'), (2, 'второе')]
+
+def test_replies_go_before_broadcasts():
+    sender = Sender()
+    queue = SendQueue(sender, rate=100, burst=100, chat_interval=0)
+    queue.send(1, 'рассылка', PRIORITY_BROADCAST)
+    queue.send(2, 'ответ', PRIORITY_REPLY)
+    for _ in range(2):
+        queue._deliver(*take(queue))
+    assert sender.sent == [(2, 'ответ'), (1, 'рассылка')]
+
+def test_one_chat_waits_for_chat_interval():
+    sender = Sender()
+    queue = SendQueue(sender, rate=100, burst=100, chat_interval=1.0)
+    queue.send(1, 'a')
+    queue.send(1, 'b')
+    queue.send(2, 'c')
+    queue._deliver(*take(queue))
+    item, _ = take(queue)
+    assert item[1] == 'c'  # Сообщение 'b' ждёт интервала чата 1, а 'c' уходит сразу
@@ -0,0 +1,50 @@
+import pytest
+
+from timetable_bin import TimetableFile, write_timetables
+
+TIMETABLES = {
+    'ИС1-31': {
+        'Вторник': {'числитель': {'1': {'name': 'Физика', 'teacher': 'Петров В.Н.', 'cab': '101а'}}}
+    },
+    'ИБ1-41': {
+        'Понедельник': {
+            'числитель': {
+                '10': {'name': 'История', 'teacher': '', 'cab': '207'},
+                '2': {'name': 'Математика', 'teacher': 'Иванова А.С.', 'cab': '207'}
+            },
+            'знаменатель': {'2': {'name': 'Базы данных', 'teacher': 'Иванова А.С.', 'cab': '312'}}
+        },
+        'Суббота': {'числитель': {'1': {'name': 'Математика'}}}
+    }
+}
+
+def as_dicts(schedule):
+    return {
+        day: {
+            week_type: {pair: {'name': lesson.name, 'teacher': lesson.teacher, 'cab': lesson.cab}
+                       for pair, lesson in pairs.items()}
+            for week_type, pairs in weeks.items()
+        }
+        for day, weeks in schedule.items()
+    }
+
+@pytest.fixture
+def timetables(tmp_path):
+    path = str(tmp_path / 'timetables.bin')
+    write_timetables(TIMETABLES, path)
+    return TimetableFile(path)
+
+def test_round_trip(timetables):
+    assert timetables.group_names() == sorted(TIMETABLES)
+    assert as_dicts(timetables.get('ИС1-31')) == TIMETABLES['ИС1-31']
+    schedule = as_dicts(timetables.get('ИБ1-41'))
+    assert schedule['Суббота']['числитель']['1'] == {'name': 'Математика', 'teacher': '', 'cab': ''}
+    assert schedule['Понедельник'] == TIMETABLES['ИБ1-41']['Понедельник']
+    assert list(schedule['Понедельник']['числитель']) == ['2', '10']  # Пары по порядку номеров
+
+def test_shared_lessons_and_missing_group(timetables):
+    monday = timetables.get('ИБ1-41')['Понедельник']
+    assert timetables.get('ИБ1-41') is timetables.get('ИБ1-41')
+    assert monday['числитель']['2'].teacher is monday['знаменатель']['2'].teacher
+    assert timetables.get('КС1-11') is None
+    assert timetables.get('КС1-11', {}) == {}
@@ -0,0 +1,61 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from webhook import SECRET_HEADER, WebhookServer
+
+class StubDispatcher:
+    """Заглушка ChatDispatcher: принимает не больше capacity обновлений."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.updates = []
+
+    def submit(self, update, block=False):
+        if len(self.updates) >= self.capacity:
+            return False
+        self.updates.append(update)
+        return True
+
+@pytest.fixture
+def server():
+    server = WebhookServer(StubDispatcher(capacity=1), ('127.0.0.1', 0), '/hook', 'secret')
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def post(server, path='/hook', secret='secret', update_id=1):
+    body = json.dumps({
+        'update_id': update_id,
+        'message': {'message_id': 1, 'date': 0, 'text': 'Сегодня', 'chat': {'id': 5, 'type': 'private'}}
+    }).encode('utf-8')
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{server.server_address[1]}{path}", body,
+        {'Content-Type': 'application/json', SECRET_HEADER: secret}
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+def test_accepted_update(server):
+    assert post(server) == 200
+    assert [update.update_id for update in server.dispatcher.updates] == [1]
+
+def test_bad_secret(server):
+    assert post(server, secret='wrong') == 403
+    assert not server.dispatcher.updates
+
+def test_wrong_path(server):
+    assert post(server, path='/other') == 404
+    assert not server.dispatcher.updates
+
+def test_full_queue(server):
+    assert post(server, update_id=1) == 200
+    assert post(server, update_id=2) == 503  # Telegram повторит доставку позже
+    assert [update.update_id for update in server.dispatcher.updates] == [1]
@@ -0,0 +1,160 @@
+"""Компактный двоичный формат расписаний всех групп.
+
+Файл открывается через mmap и читается лениво: при запуске разбирается
+только заголовок, расписание группы декодируется при первом обращении.
+
+Структура (все числа little-endian):
+    заголовок        HEADER
+    смещения строк   (string_count + 1) x u32 относительно начала блока строк
+    индекс групп     group_count x GROUP, отсортирован по названию группы
+    блок строк       UTF-8 строки подряд (каждая встречается один раз)
+    записи пар       RECORD фиксированной длины, сгруппированы и упорядочены
+                     по (группа, день, тип недели, номер пары)
+
+Собирается командой:
+    python xlsx_import.py oit.xlsx timetables.bin
+"""
+import os
+import mmap
+import struct
+import tempfile
+
+from lessons import make_lesson, intern_text
+
+MAGIC = b'YGKT'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIIII')  # сигнатура, версия, резерв, строк, групп, блок строк, записи
+GROUP = struct.Struct('<III')  # id названия, первая запись, число записей
+RECORD = struct.Struct('<BBBxIII')  # день, тип недели, пара, id дисциплины, преподавателя, кабинета
+OFFSET = struct.Struct('<I')
+
+DAYS = ("Понедельник", "Вторник", "Среда", "Четверг", "Пятница", "Суббота", "Воскресенье")
+WEEK_TYPES = ("числитель", "знаменатель")
+
+def write_timetables(timetables, path):
+    """Записывает расписания (группа -> день -> неделя -> пара -> занятие) в файл.
+
+    Файл заменяется атомарно, поэтому уже открытые отображения остаются целыми.
+    """
+    string_ids = {}
+    strings = []
+
+    def intern(value):
+        if value not in string_ids:
+            string_ids[value] = len(strings)
+            strings.append(value)
+        return string_ids[value]
+
+    groups = []
+    records = []
+    for group in sorted(timetables):
+        first = len(records)
+        days = timetables[group]
+        for day in sorted(days, key=DAYS.index):
+            for week_type in sorted(days[day], key=WEEK_TYPES.index):
+                pairs = days[day][week_type]
+                for pair in sorted(pairs, key=int):
+                    lesson = pairs[pair]
+                    records.append((
+                        DAYS.index(day),
+                        WEEK_TYPES.index(week_type),
+                        int(pair),
+                        intern(lesson.get('name', '')),
+                        intern(lesson.get('teacher', '')),
+                        intern(lesson.get('cab', ''))
+                    ))
+        groups.append((intern(group), first, len(records) - first))
+
+    encoded = [value.encode('utf-8') for value in strings]
+    blob = b''.join(encoded)
+    offsets = [0]
+    for value in encoded:
+        offsets.append(offsets[-1] + len(value))
+
+    blob_offset = HEADER.size + OFFSET.size * len(offsets) + GROUP.size * len(groups)
+    records_offset = blob_offset + len(blob)
+    records_offset += -records_offset % 4  # Выравнивание записей
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, 0, len(strings), len(groups), blob_offset, records_offset))
+            f.write(b''.join(OFFSET.pack(offset) for offset in offsets))
+            f.write(b''.join(GROUP.pack(*entry) for entry in groups))
+            f.write(blob)
+            f.write(b'\0' * (records_offset - blob_offset - len(blob)))
+            f.write(b''.join(RECORD.pack(*record) for record in records))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+class TimetableFile:
+    """Расписания из двоичного файла с ленивым чтением через mmap.
+
+    Поддерживает get(группа, default), как словарь группа -> расписание.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, self.string_count, self.group_count, self.blob_offset, self.records_offset = \
+            HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Неизвестный формат файла расписаний: {path}")
+        self.groups_offset = HEADER.size + OFFSET.size * (self.string_count + 1)
+        self.strings = {}  # id -> строка, декодируется при первом обращении
+        self.schedules = {}  # группа -> расписание, собирается при первом обращении
+
+    def string(self, index):
+        """Строка из таблицы по её id."""
+        value = self.strings.get(index)
+        if value is None:
+            start, end = struct.unpack_from('<II', self.data, HEADER.size + OFFSET.size * index)
+            value = intern_text(self.data[self.blob_offset + start:self.blob_offset + end].decode('utf-8'))
+            self.strings[index] = value
+        return value
+
+    def group_entry(self, position):
+        """Запись индекса групп: (название, первая запись, число записей)."""
+        name_id, first, count = GROUP.unpack_from(self.data, self.groups_offset + GROUP.size * position)
+        return self.string(name_id), first, count
+
+    def find_group(self, group):
+        """Двоичный поиск группы в индексе. Возвращает (первая запись, число) или None."""
+        low, high = 0, self.group_count
+        while low < high:
+            middle = (low + high) // 2
+            name, first, count = self.group_entry(middle)
+            if name == group:
+                return first, count
+            if name < group:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def group_names(self):
+        """Названия всех групп в файле."""
+        return [self.group_entry(position)[0] for position in range(self.group_count)]
+
+    def get(self, group, default=None):
+        """Расписание группы: день -> тип недели -> пара -> Lesson (пары по порядку)."""
+        schedule = self.schedules.get(group)
+        if schedule is not None:
+            return schedule
+        entry = self.find_group(group)
+        if entry is None:
+            return default
+
+        first, count = entry
+        schedule = {}
+        for position in range(first, first + count):
+            day, week_type, pair, name, teacher, cab = RECORD.unpack_from(
+                self.data, self.records_offset + RECORD.size * position
+            )
+            pairs = schedule.setdefault(DAYS[day], {}).setdefault(WEEK_TYPES[week_type], {})
+            pairs[str(pair)] = make_lesson(self.string(name), self.string(teacher), self.string(cab))
+        self.schedules[group] = schedule
+        return schedule
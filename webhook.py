@@ -0,0 +1,66 @@
+"""Приём обновлений Telegram через webhook вместо long polling.
+
+Небольшой HTTP-сервер принимает POST от Telegram и сразу отвечает 200,
+а обработку обновления передаёт пулу потоков (dispatcher.ChatDispatcher).
+Очередь пула ограничена: если она заполнена, сервер отвечает 503 и
+Telegram повторит доставку позже, поэтому память не растёт при всплеске
+сообщений.
+
+Обычно сервер слушает локальный порт за обратным прокси с HTTPS
+(nginx и т. п.), адрес прокси передаётся Telegram в set_webhook.
+"""
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from telebot.types import Update
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+MAX_BODY = 1024 * 1024  # Обновления Telegram намного меньше
+
+class WebhookServer(ThreadingHTTPServer):
+    """HTTP-сервер webhook, передающий обновления в ChatDispatcher."""
+    daemon_threads = True
+
+    def __init__(self, dispatcher, listen, path='/', secret=''):
+        super().__init__(listen, WebhookHandler)
+        self.dispatcher = dispatcher
+        self.webhook_path = path
+        self.secret = secret
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    """Принимает POST с обновлением Telegram."""
+
+    def do_POST(self):
+        server = self.server
+        if self.path != server.webhook_path:
+            return self._reply(404)
+        if server.secret and self.headers.get(SECRET_HEADER) != server.secret:
+            return self._reply(403)
+        length = int(self.headers.get('Content-Length') or 0)
+        if not 0 < length <= MAX_BODY:
+            return self._reply(400)
+        try:
+            update = Update.de_json(json.loads(self.rfile.read(length)))
+        except Exception:
+            return self._reply(400)
+        self._reply(200 if server.dispatcher.submit(update) else 503)
+
+    def _reply(self, status):
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass  # Не печатаем строку на каждое сообщение пользователя
+
+def run_webhook(bot, dispatcher, url, listen, secret=''):
+    """Регистрирует webhook в Telegram и обслуживает его до остановки процесса."""
+    path = '/' + url.split('://', 1)[-1].partition('/')[2]
+    server = WebhookServer(dispatcher, listen, path, secret)
+    bot.remove_webhook()
+    bot.set_webhook(url=url, secret_token=secret or None)
+    print(f"Webhook: {url} -> http://{listen[0]}:{listen[1]}{path}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
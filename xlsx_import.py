@@ -0,0 +1,215 @@
+"""Импорт расписания всех групп из файла Excel (например, oit.xlsx).
+
+Листы читаются потоково (iterparse по XML внутри архива), поэтому в
+памяти держатся только нужные ячейки текущего листа, а не вся книга.
+
+Ожидаемая структура листа:
+    строка с группами    "ИБ1-41/ИБ1-42/ИБ2-31" (одно расписание на все)
+    строка с днём        "Понедельник"
+    две строки на пару   A — номер пары, B — дисциплина, F — преподаватель,
+                         I — кабинет; верхняя строка — числитель, нижняя —
+                         знаменатель. Ячейка, объединённая на обе строки,
+                         действует в обе недели.
+
+Результат — расписания вида группа -> день -> тип недели -> пара -> занятие,
+которые читает telbot.load_schedule: двоичный файл timetable_bin (если имя
+оканчивается на .bin) или JSON.
+
+Запуск:
+    python xlsx_import.py oit.xlsx timetables.bin
+"""
+import re
+import sys
+import json
+import zipfile
+import posixpath
+import xml.etree.ElementTree as ET
+
+from groups import GROUP_PATTERN, normalize_group
+from timetable_bin import write_timetables
+
+NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+PKG_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+DAYS = ("Понедельник", "Вторник", "Среда", "Четверг", "Пятница", "Суббота")
+WEEK_TYPES = ("числитель", "знаменатель")
+COLUMNS = ('A', 'B', 'F', 'I')  # Пара, дисциплина, преподаватель, кабинет
+MERGED_COLUMNS = ('B', 'F', 'I')  # Столбцы, где объединение на две строки значит "обе недели"
+TIME_PATTERN = re.compile(r'^\s*\d{1,2}\s*[.:]\s*\d{2}\s*$')  # "08. 25" — время нулевой пары
+CELL_REF = re.compile(r'([A-Z]+)(\d+)')
+
+def split_ref(ref):
+    """"B12" -> ("B", 12)."""
+    col, row = CELL_REF.fullmatch(ref).groups()
+    return col, int(row)
+
+def clean_text(value):
+    """Сводит многострочную ячейку к одной строке без повторов."""
+    lines = []
+    for line in value.replace('\r', '\n').split('\n'):
+        line = ' '.join(line.split())
+        if line and line not in lines:
+            lines.append(line)
+    return ', '.join(lines)
+
+def iter_elements(archive, path, tag, discard=()):
+    """Потоково перебирает элементы tag в XML-файле архива.
+
+    Прочитанные элементы и элементы с тегами из discard сразу очищаются,
+    чтобы дерево документа не накапливалось в памяти.
+    """
+    with archive.open(path) as f:
+        for _, element in ET.iterparse(f):
+            if element.tag == tag:
+                yield element
+                element.clear()
+            elif element.tag in discard:
+                element.clear()
+
+def read_shared_strings(archive):
+    """Читает таблицу общих строк книги."""
+    if 'xl/sharedStrings.xml' not in archive.namelist():
+        return []
+    return [
+        ''.join(t.text or '' for t in si.iter(NS + 't'))
+        for si in iter_elements(archive, 'xl/sharedStrings.xml', NS + 'si')
+    ]
+
+def list_sheets(archive):
+    """Возвращает [(название листа, путь к XML)] в порядке книги."""
+    with archive.open('xl/_rels/workbook.xml.rels') as f:
+        targets = {rel.get('Id'): rel.get('Target') for rel in ET.parse(f).getroot().iter(PKG_REL_NS + 'Relationship')}
+    with archive.open('xl/workbook.xml') as f:
+        sheets = ET.parse(f).getroot().iter(NS + 'sheet')
+        return [
+            (sheet.get('name'), posixpath.normpath(posixpath.join('xl', targets[sheet.get(REL_NS + 'id')].lstrip('/'))))
+            for sheet in sheets
+        ]
+
+def read_merges(archive, path):
+    """Возвращает словарь ячейка -> верхняя ячейка вертикального объединения.
+
+    Учитываются только объединения, начинающиеся в MERGED_COLUMNS:
+    горизонтальные (заголовки, B:E) на значения не влияют. Объединения
+    записаны в конце листа, поэтому их читают отдельным проходом.
+    """
+    merges = {}
+    for merge in iter_elements(archive, path, NS + 'mergeCell', discard=(NS + 'row',)):
+        first, _, last = merge.get('ref').partition(':')
+        first_col, first_row = split_ref(first)
+        if first_col not in MERGED_COLUMNS or not last:
+            continue
+        _, last_row = split_ref(last)
+        for row in range(first_row + 1, last_row + 1):
+            merges[(first_col, row)] = (first_col, first_row)
+    return merges
+
+def iter_rows(archive, path, shared, merges):
+    """Перебирает строки листа как (номер, {столбец: текст}).
+
+    Значения объединённых ячеек подставляются из левой верхней ячейки.
+    """
+    origins = {}  # Значения ячеек, на которые ссылаются объединения
+    merge_origins = set(merges.values())
+    for row in iter_elements(archive, path, NS + 'row'):
+        number = int(row.get('r'))
+        values = {}
+        for cell in row.iter(NS + 'c'):
+            col, _ = split_ref(cell.get('r'))
+            if col not in COLUMNS:
+                continue
+            value = cell.findtext(NS + 'v')
+            if value is None:
+                inline = cell.find(NS + 'is')
+                value = ''.join(t.text or '' for t in inline.iter(NS + 't')) if inline is not None else ''
+            elif cell.get('t') == 's':
+                value = shared[int(value)]
+            if (col, number) in merge_origins:
+                origins[(col, number)] = value
+            if value.strip():
+                values[col] = value
+        for col in MERGED_COLUMNS:
+            origin = merges.get((col, number))
+            if origin and col not in values and origins.get(origin, '').strip():
+                values[col] = origins[origin]
+        yield number, values
+
+def parse_pair_label(label):
+    """Номер пары из столбца A. Время ("08. 25") означает нулевую пару."""
+    label = label.strip()
+    if label.isdigit():
+        return label
+    if TIME_PATTERN.match(label):
+        return '0'
+    return None
+
+def lesson_from(values):
+    """Занятие из ячеек строки или None, если дисциплины нет."""
+    name = clean_text(values.get('B', ''))
+    if not name:
+        return None
+    return {
+        'name': name,
+        'teacher': clean_text(values.get('F', '')),
+        'cab': clean_text(values.get('I', ''))
+    }
+
+def import_sheet(archive, path, shared, timetables):
+    """Добавляет в timetables расписания всех групп одного листа."""
+    merges = read_merges(archive, path)
+    groups, day, pair, first_row = [], None, None, None
+    for number, values in iter_rows(archive, path, shared, merges):
+        label = values.get('A', '')
+        label_text = ' '.join(label.split())
+
+        if label_text in DAYS:
+            day, pair = label_text, None
+            continue
+        found = GROUP_PATTERN.findall(normalize_group(label_text)) if 'B' not in values else []
+        if found:
+            groups, day, pair = found, None, None
+            for group in groups:
+                timetables.setdefault(group, {})
+            continue
+        if not groups or not day:
+            continue
+
+        new_pair = parse_pair_label(label) if label_text else None
+        if new_pair is not None:
+            pair, first_row = new_pair, number
+            week_type = WEEK_TYPES[0]
+        elif pair is not None and number == first_row + 1:
+            week_type = WEEK_TYPES[1]
+        else:
+            pair = None  # Сноски и прочие строки вне пар
+            continue
+
+        lesson = lesson_from(values)
+        if lesson is None:
+            continue
+        for group in groups:
+            timetables[group].setdefault(day, {}).setdefault(week_type, {})[pair] = lesson
+
+def import_workbook(path):
+    """Возвращает расписания всех групп книги: группа -> день -> неделя -> пара -> занятие."""
+    timetables = {}
+    with zipfile.ZipFile(path) as archive:
+        shared = read_shared_strings(archive)
+        for _, sheet_path in list_sheets(archive):
+            import_sheet(archive, sheet_path, shared, timetables)
+    return {group: days for group, days in timetables.items() if days}
+
+def main(argv):
+    source = argv[1] if len(argv) > 1 else 'oit.xlsx'
+    target = argv[2] if len(argv) > 2 else 'timetables.bin'
+    timetables = import_workbook(source)
+    if target.endswith('.bin'):
+        write_timetables(timetables, target)
+    else:
+        with open(target, 'w', encoding='utf-8') as f:
+            json.dump(timetables, f, ensure_ascii=False, separators=(',', ':'))
+    print(f"Импортировано групп: {len(timetables)} -> {target}")
+
+if __name__ == '__main__':
+    main(sys.argv)